@@ -25,16 +25,94 @@ Platform-specific behavior:
 import sys
 import re
 import argparse
-import io
+import logging
 import shutil
 import os
-import math
+import tempfile
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from functools import lru_cache
 
 # Target ikemen version for this patcher. Only files with a lower version
 # (or missing version) will be patched.
 TARGET_IKEMEN_VERSION_STR = "1.0"
 TARGET_IKEMEN_VERSION = 1.0
 
+# Diagnostics go through this logger. Per-line messages ("Key modified",
+# "Recorded offset", ...) are logged at DEBUG and only shown with --verbose;
+# progress messages (including "Backup created") are logged at INFO and
+# hidden by --quiet; warnings and errors are always shown. The %-style
+# arguments are only formatted when a record is actually emitted. Setting
+# SPU_DEBUG in the environment turns on the per-line messages without
+# --verbose (e.g. when the tool is launched by another program).
+log = logging.getLogger("screenpack-updater")
+_DEBUG = bool(os.environ.get("SPU_DEBUG"))
+
+class _BufferedStderrHandler(logging.Handler):
+    """
+    Collect formatted records and write them to stderr in a single call on
+    flush(), which process_ini() does once per file, instead of one write
+    per message. The buffer is also flushed once it holds `capacity`
+    records, and records at INFO or above flush straight away so they keep
+    their place relative to other output.
+    """
+    def __init__(self, capacity=4096):
+        super().__init__()
+        self.capacity = capacity
+        self.buffer = []
+
+    def emit(self, record):
+        self.buffer.append(self.format(record) + "\n")
+        if record.levelno >= logging.INFO or len(self.buffer) >= self.capacity:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            sys.stderr.write("".join(self.buffer))
+            self.buffer.clear()
+
+_log_handler = _BufferedStderrHandler()
+
+def _flush_log():
+    _log_handler.flush()
+
+# Decoded file contents keyed by real path, so the version check and the
+# patcher share a single read of the input file. Values are (text, lines).
+_loaded_files = {}
+
+def _load_file(path: str):
+    """
+    Read `path` once and return (text, lines). text is the content as a text
+    file opened with encoding='utf-8-sig', errors='replace' would return it:
+    BOM removed and universal newlines translated to '\n'. lines is text
+    split at '\n' with the terminators removed. The result is cached for the
+    rest of the run.
+    """
+    key = os.path.realpath(path)
+    loaded = _loaded_files.get(key)
+    if loaded is None:
+        with open(path, "rb") as f:
+            data = f.read()
+        # Decode once and keep working on str. CPython stores ASCII-only text
+        # one byte per character (PEP 393), so a bytes pipeline would not
+        # shrink the data, while non-ASCII values (names, fonts) and the
+        # text output streams would need extra encode/decode steps.
+        text = data.decode("utf-8-sig", "replace")
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+        # Split at '\n' only: str.splitlines() would also break at characters
+        # such as '\x0c' or '\u2028' that a text file read keeps inside a line.
+        lines = text.split("\n")
+        if lines[-1] == "":
+            lines.pop()
+        loaded = _loaded_files[key] = (text, lines)
+    return loaded
+
+def _load_lines(path: str):
+    """Return the lines of `path` (see _load_file) without line terminators."""
+    return _load_file(path)[1]
+
 def _parse_ikemen_version_to_float(value: str):
     """
     Parse version string using only the first two numeric components (major.minor).
@@ -44,15 +122,20 @@ def _parse_ikemen_version_to_float(value: str):
     value_body = value_body.strip().strip('"')
     if not value_body:
         return None
-    parts = value_body.split(".")
-    if not parts:
-        return None
-    if len(parts) == 1:
-        core = parts[0]
-    else:
-        core = parts[0] + "." + parts[1]
+    major, dot, rest = value_body.partition(".")
+    minor = rest.partition(".")[0]
+    try:
+        if major.isdecimal() and (not minor or minor.isdecimal()):
+            # Plain "major.minor": join the digits and divide once, which
+            # gives the same correctly rounded value float("major.minor")
+            # would.
+            return int(major + minor) / 10 ** len(minor)
+    except (ValueError, OverflowError):
+        # Too many digits for int() or for a float result; float() below
+        # still parses these (to inf for a huge major).
+        pass
     try:
-        return float(core)
+        return float(major + dot + minor)
     except ValueError:
         return None
 
@@ -68,40 +151,35 @@ def _detect_ikemen_version(ini_path: str):
     current_section = ""
 
     try:
-        with open(ini_path, "r", encoding="utf-8-sig", errors="replace") as f:
-            for line in f:
-                m_sec = SECTION_REGEX.match(line)
-                if m_sec:
-                    current_section = m_sec.group(1).strip().lower()
-                    if current_section == "info":
-                        has_info = True
-                    continue
-
-                m_kv = KEY_VALUE_REGEX.match(line)
-                if not m_kv:
-                    continue
-
-                semicolon = m_kv.group(1)
-                if semicolon == ";":
-                    # Entire line commented out.
-                    continue
-
+        for line in _load_lines(ini_path):
+            # Only lines starting with '[' can be headers; skip the regex otherwise.
+            m_sec = SECTION_REGEX.match(line) if line.lstrip()[:1] == "[" else None
+            if m_sec:
+                current_section = m_sec.group("name").strip().lower()
                 if current_section == "info":
-                    key = m_kv.group(2).strip().lower()
-                    if key == "ikemenversion":
-                        raw_version = m_kv.group(3)
-                        parsed = _parse_ikemen_version_to_float(raw_version)
-                        break
+                    has_info = True
+                continue
+
+            m_kv = KEY_VALUE_REGEX.match(line)
+            if not m_kv:
+                continue
+
+            semicolon = m_kv.group(1)
+            if semicolon == ";":
+                # Entire line commented out.
+                continue
+
+            if current_section == "info":
+                key = m_kv.group(2).strip().lower()
+                if key == "ikemenversion":
+                    raw_version = m_kv.group(3)
+                    parsed = _parse_ikemen_version_to_float(raw_version)
+                    break
     except OSError as e:
-        print(f"WARNING: Failed to read '{ini_path}' to detect ikemenversion: {e}", file=sys.stderr)
+        log.warning("WARNING: Failed to read '%s' to detect ikemenversion: %s", ini_path, e)
 
     return has_info, raw_version, parsed
 
-if sys.platform == "win32":
-    # Only used when launched without arguments on Windows.
-    import tkinter as tk
-    from tkinter import filedialog
-
 # Section renames for Ikemen 1.0 screenpacks
 SECTION_RENAMES = {
     "menu info": "pause menu",
@@ -126,195 +204,462 @@ append_if_missing = {
     },
 }
 
+# The non-ASCII letters that re.IGNORECASE treats as equal to an ASCII one
+# ("\u212a", the Kelvin sign, already lowercases to "k").
+_ASCII_CASE_FOLDS = str.maketrans({"\u0130": "i", "\u0131": "i", "\u017f": "s"})
+
+def _match_key(key: str) -> str:
+    """
+    Return `key` lowercased for matching against the rule patterns. Keys
+    with I/i with or without a dot, or the long s, have those folded to
+    their ASCII letter first, so they match as they did with re.IGNORECASE
+    (a plain lower() would turn the dotted I into two code points). The
+    result always has the same length as `key`.
+    """
+    key_lc = key.lower()
+    if key_lc.isascii():
+        return key_lc
+    return key.translate(_ASCII_CASE_FOLDS).lower()
+
+# Key patterns in the rule tables below are matched against _match_key() of
+# the key, so they are written in lowercase and compiled without
+# re.IGNORECASE.
 keys_to_delete = {
     "languages": [
-        re.compile(r"^languages$", re.IGNORECASE),
+        re.compile(r"^languages$"),
     ],
     "vs screen": [
-        re.compile(r"^p2\.accept\.key$", re.IGNORECASE),
-        re.compile(r"^p2\.skip\.key$", re.IGNORECASE),
+        re.compile(r"^p2\.accept\.key$"),
+        re.compile(r"^p2\.skip\.key$"),
     ],
     "victory screen": [
-        re.compile(r"^winquote\.time$", re.IGNORECASE),
+        re.compile(r"^winquote\.time$"),
     ],
     "attract mode": [
-        re.compile(r"^credits\.key$", re.IGNORECASE),
-        re.compile(r"^options\.key$", re.IGNORECASE),
+        re.compile(r"^credits\.key$"),
+        re.compile(r"^options\.key$"),
     ],
     "option info": [
-        re.compile(r"^menu\.uselocalcoord$", re.IGNORECASE),
-        re.compile(r"^keymenu\.itemname\.playerno$", re.IGNORECASE),
+        re.compile(r"^menu\.uselocalcoord$"),
+        re.compile(r"^keymenu\.itemname\.playerno$"),
     ],
     "replay info": [
-        re.compile(r"^menu\.uselocalcoord$", re.IGNORECASE),
+        re.compile(r"^menu\.uselocalcoord$"),
     ],
     "pause menu": [
-        re.compile(r"^menu\.uselocalcoord$", re.IGNORECASE),
+        re.compile(r"^menu\.uselocalcoord$"),
     ],
     "training pause menu": [
-        re.compile(r"^menu\.uselocalcoord$", re.IGNORECASE),
+        re.compile(r"^menu\.uselocalcoord$"),
     ],
 }
 
+# '%s' / '%i' / '%0Ns' / '%Ni' placeholders, rewritten to their '%d' form by
+# _printf_to_int() in a single pass.
+_RE_PRINTF_STR_OR_INT = re.compile(r"%(?:0?([0-9]+))?[si]")
+
+def _printf_to_int(m):
+    """
+    Replacement for _RE_PRINTF_STR_OR_INT: '%0Ns' / '%Ni' -> '%0Nd' and
+    '%s' / '%i' -> '%d'.
+    """
+    width = m.group(1)
+    return f"%0{width}d" if width is not None else "%d"
+
 value_modifications = {
     "victory screen": [
-        (re.compile(r"^winquote\.spacing$", re.IGNORECASE), re.compile(r"^([^,]*),([^,]*)$"), r"\2"),
+        (re.compile(r"^winquote\.spacing$"), re.compile(r"^([^,]*),([^,]*)$"), r"\2"),
     ],
     "dialogue info": [
-        (re.compile(r"^p[12]\.text\.spacing$", re.IGNORECASE), re.compile(r"^([^,]*),([^,]*)$"), r"\2"),
+        (re.compile(r"^p[12]\.text\.spacing$"), re.compile(r"^([^,]*),([^,]*)$"), r"\2"),
     ],
     "hiscore info": [
-        (re.compile(r"^item\.name\.text$", re.IGNORECASE), re.compile(r"^.*$"), r"%s"),
-        (re.compile(r"^item\.rank\.?[0-9]*\.text$", re.IGNORECASE), re.compile(r"%0?([0-9]+)[si]"), r"%0\1d"),
-        (re.compile(r"^item\.rank\.?[0-9]*\.text$", re.IGNORECASE), re.compile(r"%[si]"), r"%d"),
-        (re.compile(r"^item\.data\.(?!time\.).*text$", re.IGNORECASE), re.compile(r"%0?([0-9]+)[si]"), r"%0\1d"),
-        (re.compile(r"^item\.data\.(?!time\.).*text$", re.IGNORECASE), re.compile(r"%[si]"), r"%d"),
-
-        (re.compile(r"^item\.data\.text\.win$", re.IGNORECASE), re.compile(r"%s"), "%d"),
-        (re.compile(r"^item\.rank\.text\.default$", re.IGNORECASE), re.compile(r"%s"), "%d"),
-        (re.compile(r"^item\.rank\.text\.[0-9]+$", re.IGNORECASE), re.compile(r"%s"), "%d"),
+        (re.compile(r"^item\.name\.text$"), re.compile(r"^.*$"), r"%s"),
+        (re.compile(r"^item\.rank\.?[0-9]*\.text$"), _RE_PRINTF_STR_OR_INT, _printf_to_int),
+        (re.compile(r"^item\.data\.(?!time\.).*text$"), _RE_PRINTF_STR_OR_INT, _printf_to_int),
+
+        (re.compile(r"^item\.data\.text\.win$"), re.compile(r"%s"), "%d"),
+        (re.compile(r"^item\.rank\.text\.default$"), re.compile(r"%s"), "%d"),
+        (re.compile(r"^item\.rank\.text\.[0-9]+$"), re.compile(r"%s"), "%d"),
     ],
     "continue screen": [
-        (re.compile(r"^credits\.text$", re.IGNORECASE), re.compile(r"%0?([0-9]+)[si]"), r"%0\1d"),
-        (re.compile(r"^credits\.text$", re.IGNORECASE), re.compile(r"%[si]"), r"%d"),
+        (re.compile(r"^credits\.text$"), _RE_PRINTF_STR_OR_INT, _printf_to_int),
     ],
     "attract mode": [
-        (re.compile(r"^credits\.text$", re.IGNORECASE), re.compile(r"%0?([0-9]+)[si]"), r"%0\1d"),
-        (re.compile(r"^credits\.text$", re.IGNORECASE), re.compile(r"%[si]"), r"%d"),
+        (re.compile(r"^credits\.text$"), _RE_PRINTF_STR_OR_INT, _printf_to_int),
     ],
 }
 
+# Background element patterns. The menu.bg pair is reused by every menu
+# section below; the keymenu.bg pair belongs to [Option Info].
+_RE_MENU_BG_ACTIVE = re.compile(r"^menu\.bg\.active\.(.+)\.(anim|spr|offset|facing|scale|xshear|angle|layerno|window|localcoord)$")
+_RE_MENU_BG = re.compile(r"^menu\.bg\.(.+)\.(anim|spr|offset|facing|scale|xshear|angle|layerno|window|localcoord)$")
+_RE_KEYMENU_BG_ACTIVE = re.compile(r"^keymenu\.bg\.active\.(.+)\.(anim|spr|offset|facing|scale|xshear|angle|layerno|window|localcoord)$")
+_RE_KEYMENU_BG = re.compile(r"^keymenu\.bg\.(.+)\.(anim|spr|offset|facing|scale|xshear|angle|layerno|window|localcoord)$")
+
 transformations = {
     "music": [
-        (re.compile(r"^continue\.end\.(.+)$", re.IGNORECASE), ["continueend.\\1"]),
-        (re.compile(r"^results\.lose\.(.+)$", re.IGNORECASE), ["resultslose.\\1"]),
+        (re.compile(r"^continue\.end\.(.+)$"), ["continueend.\\1"]),
+        (re.compile(r"^results\.lose\.(.+)$"), ["resultslose.\\1"]),
     ],
     "title info": [
-        (re.compile(r"^menu\.bg\.active\.(.+)\.(anim|spr|offset|facing|scale|xshear|angle|layerno|window|localcoord)$", re.IGNORECASE), ["menu.item.active.bg.\\1.\\2"]),
-        (re.compile(r"^menu\.bg\.(.+)\.(anim|spr|offset|facing|scale|xshear|angle|layerno|window|localcoord)$", re.IGNORECASE), ["menu.item.bg.\\1.\\2"]),
+        (_RE_MENU_BG_ACTIVE, ["menu.item.active.bg.\\1.\\2"]),
+        (_RE_MENU_BG, ["menu.item.bg.\\1.\\2"]),
 
-        (re.compile(r"^cursor\.(?!done\.)(.+)\.snd$", re.IGNORECASE), ["cursor.done.\\1.snd"]),
+        (re.compile(r"^cursor\.(?!done\.)(.+)\.snd$"), ["cursor.done.\\1.snd"]),
 
-        (re.compile(r"^menu\.accept\.key$", re.IGNORECASE), ["menu.done.key"]),
+        (re.compile(r"^menu\.accept\.key$"), ["menu.done.key"]),
 
-        (re.compile(r"^footer1\.(font|offset|scale|xshear|angle|text|layerno|window|localcoord)$", re.IGNORECASE), ["footer.title.\\1"]),
-        (re.compile(r"^footer2\.(font|offset|scale|xshear|angle|text|layerno|window|localcoord)$", re.IGNORECASE), ["footer.info.\\1"]),
-        (re.compile(r"^footer3\.(font|offset|scale|xshear|angle|text|layerno|window|localcoord)$", re.IGNORECASE), ["footer.version.\\1"]),
+        (re.compile(r"^footer1\.(font|offset|scale|xshear|angle|text|layerno|window|localcoord)$"), ["footer.title.\\1"]),
+        (re.compile(r"^footer2\.(font|offset|scale|xshear|angle|text|layerno|window|localcoord)$"), ["footer.info.\\1"]),
+        (re.compile(r"^footer3\.(font|offset|scale|xshear|angle|text|layerno|window|localcoord)$"), ["footer.version.\\1"]),
     ],
     "select info": [
         # cell.* and cursor.* remap (and 1-based -> 0-based) is handled in apply_key_transformations()
 
-        (re.compile(r"^p([12])\.teammenu\.accept\.key$", re.IGNORECASE), ["p\\1.teammenu.done.key"]),
+        (re.compile(r"^p([12])\.teammenu\.accept\.key$"), ["p\\1.teammenu.done.key"]),
 
-        (re.compile(r"^p([12])\.palmenu\.accept\.key$", re.IGNORECASE), ["p\\1.palmenu.done.key"]),
+        (re.compile(r"^p([12])\.palmenu\.accept\.key$"), ["p\\1.palmenu.done.key"]),
 
-        (re.compile(r"^p[12]\.palmenu\.random\.applypal$", re.IGNORECASE), ["palmenu.random.applypal"]),
+        (re.compile(r"^p[12]\.palmenu\.random\.applypal$"), ["palmenu.random.applypal"]),
 
-        (re.compile(r"^stage\.active\.font$", re.IGNORECASE), ["stage.font", "stage.active.font"]),
-        (re.compile(r"^stage\.active\.(offset|scale|xshear|angle|text|layerno|window|localcoord)$", re.IGNORECASE), ["stage.\\1"]),
+        (re.compile(r"^stage\.active\.font$"), ["stage.font", "stage.active.font"]),
+        (re.compile(r"^stage\.active\.(offset|scale|xshear|angle|text|layerno|window|localcoord)$"), ["stage.\\1"]),
 
-        (re.compile(r"^p([12])\.face\.slide\.speed$", re.IGNORECASE), ["p\\1.face.velocity"]),
-        (re.compile(r"^p([12])\.face2\.slide\.speed$", re.IGNORECASE), ["p\\1.face2.velocity"]),
-        (re.compile(r"^p([12])\.face\.slide\.dist$", re.IGNORECASE), ["p\\1.face.maxdist"]),
-        (re.compile(r"^p([12])\.face2\.slide\.dist$", re.IGNORECASE), ["p\\1.face2.maxdist"]),
+        (re.compile(r"^p([12])\.face\.slide\.speed$"), ["p\\1.face.velocity"]),
+        (re.compile(r"^p([12])\.face2\.slide\.speed$"), ["p\\1.face2.velocity"]),
+        (re.compile(r"^p([12])\.face\.slide\.dist$"), ["p\\1.face.maxdist"]),
+        (re.compile(r"^p([12])\.face2\.slide\.dist$"), ["p\\1.face2.maxdist"]),
     ],
     "vs screen": [
-        (re.compile(r"^p1\.accept\.key$", re.IGNORECASE), ["done.key"]),
-        (re.compile(r"^p1\.skip\.key$", re.IGNORECASE), ["skip.key"]),
+        (re.compile(r"^p1\.accept\.key$"), ["done.key"]),
+        (re.compile(r"^p1\.skip\.key$"), ["skip.key"]),
 
-        (re.compile(r"^p([1-8])\.icon\.(offset|facing|scale|xshear|angle|layerno|window|localcoord)$", re.IGNORECASE), ["p\\1.icon.\\2", "p\\1.icon.done.\\2"]),
+        (re.compile(r"^p([1-8])\.icon\.(offset|facing|scale|xshear|angle|layerno|window|localcoord)$"), ["p\\1.icon.\\2", "p\\1.icon.done.\\2"]),
 
-        (re.compile(r"^p([12])\.slide\.speed$", re.IGNORECASE), ["p\\1.velocity"]),
-        (re.compile(r"^p([12])\.face2\.slide\.speed$", re.IGNORECASE), ["p\\1.face2.velocity"]),
-        (re.compile(r"^p([12])\.slide\.dist$", re.IGNORECASE), ["p\\1.maxdist"]),
-        (re.compile(r"^p([12])\.face2\.slide\.dist$", re.IGNORECASE), ["p\\1.face2.maxdist"]),
+        (re.compile(r"^p([12])\.slide\.speed$"), ["p\\1.velocity"]),
+        (re.compile(r"^p([12])\.face2\.slide\.speed$"), ["p\\1.face2.velocity"]),
+        (re.compile(r"^p([12])\.slide\.dist$"), ["p\\1.maxdist"]),
+        (re.compile(r"^p([12])\.face2\.slide\.dist$"), ["p\\1.face2.maxdist"]),
     ],
     "victory screen": [
-        (re.compile(r"^winquote\.spacing$", re.IGNORECASE), ["winquote.textspacing"]),
-        (re.compile(r"^winquote\.delay$", re.IGNORECASE), ["winquote.textdelay"]),
+        (re.compile(r"^winquote\.spacing$"), ["winquote.textspacing"]),
+        (re.compile(r"^winquote\.delay$"), ["winquote.textdelay"]),
 
-        (re.compile(r"^p([12])\.slide\.speed$", re.IGNORECASE), ["p\\1.velocity"]),
-        (re.compile(r"^p([12])\.face2\.slide\.speed$", re.IGNORECASE), ["p\\1.face2.velocity"]),
-        (re.compile(r"^p([12])\.slide\.dist$", re.IGNORECASE), ["p\\1.maxdist"]),
-        (re.compile(r"^p([12])\.face2\.slide\.dist$", re.IGNORECASE), ["p\\1.face2.maxdist"]),
+        (re.compile(r"^p([12])\.slide\.speed$"), ["p\\1.velocity"]),
+        (re.compile(r"^p([12])\.face2\.slide\.speed$"), ["p\\1.face2.velocity"]),
+        (re.compile(r"^p([12])\.slide\.dist$"), ["p\\1.maxdist"]),
+        (re.compile(r"^p([12])\.face2\.slide\.dist$"), ["p\\1.face2.maxdist"]),
     ],
     "option info": [
-        (re.compile(r"^menu\.itemname\.menugame\.stunbar$", re.IGNORECASE), ["menu.itemname.menugame.dizzy"]),
-        (re.compile(r"^menu\.itemname\.menugame\.guardbar$", re.IGNORECASE), ["menu.itemname.menugame.guardbreak"]),
-        (re.compile(r"^menu\.itemname\.menugame\.redlifebar$", re.IGNORECASE), ["menu.itemname.menugame.redlife"]),
-        (re.compile(r"^menu\.itemname\.menuvideo\.vretrace$", re.IGNORECASE), ["menu.itemname.menuvideo.vsync"]),
-
-        (re.compile(r"^menu\.bg\.active\.(.+)\.(anim|spr|offset|facing|scale|xshear|angle|layerno|window|localcoord)$", re.IGNORECASE), ["menu.item.active.bg.\\1.\\2"]),
-        (re.compile(r"^menu\.bg\.(.+)\.(anim|spr|offset|facing|scale|xshear|angle|layerno|window|localcoord)$", re.IGNORECASE), ["menu.item.bg.\\1.\\2"]),
-        (re.compile(r"^keymenu\.bg\.active\.(.+)\.(anim|spr|offset|facing|scale|xshear|angle|layerno|window|localcoord)$", re.IGNORECASE), ["keymenu.item.active.bg.\\1.\\2"]),
-        (re.compile(r"^keymenu\.bg\.(.+)\.(anim|spr|offset|facing|scale|xshear|angle|layerno|window|localcoord)$", re.IGNORECASE), ["keymenu.item.bg.\\1.\\2"]),
-        (re.compile(r"^keymenu\.p([12])\.pos$", re.IGNORECASE), ["keymenu.p\\1.menuoffset"]),
-        (re.compile(r"^keymenu\.item\.p([12])\.(font|offset|scale|xshear|angle|text|layerno|window|localcoord)$", re.IGNORECASE), ["keymenu.p\\1.playerno.\\2"]),
+        (re.compile(r"^menu\.itemname\.menugame\.stunbar$"), ["menu.itemname.menugame.dizzy"]),
+        (re.compile(r"^menu\.itemname\.menugame\.guardbar$"), ["menu.itemname.menugame.guardbreak"]),
+        (re.compile(r"^menu\.itemname\.menugame\.redlifebar$"), ["menu.itemname.menugame.redlife"]),
+        (re.compile(r"^menu\.itemname\.menuvideo\.vretrace$"), ["menu.itemname.menuvideo.vsync"]),
+
+        (_RE_MENU_BG_ACTIVE, ["menu.item.active.bg.\\1.\\2"]),
+        (_RE_MENU_BG, ["menu.item.bg.\\1.\\2"]),
+        (_RE_KEYMENU_BG_ACTIVE, ["keymenu.item.active.bg.\\1.\\2"]),
+        (_RE_KEYMENU_BG, ["keymenu.item.bg.\\1.\\2"]),
+        (re.compile(r"^keymenu\.p([12])\.pos$"), ["keymenu.p\\1.menuoffset"]),
+        (re.compile(r"^keymenu\.item\.p([12])\.(font|offset|scale|xshear|angle|text|layerno|window|localcoord)$"), ["keymenu.p\\1.playerno.\\2"]),
     ],
     "replay info": [
-        (re.compile(r"^menu\.bg\.active\.(.+)\.(anim|spr|offset|facing|scale|xshear|angle|layerno|window|localcoord)$", re.IGNORECASE), ["menu.item.active.bg.\\1.\\2"]),
-        (re.compile(r"^menu\.bg\.(.+)\.(anim|spr|offset|facing|scale|xshear|angle|layerno|window|localcoord)$", re.IGNORECASE), ["menu.item.bg.\\1.\\2"]),
+        (_RE_MENU_BG_ACTIVE, ["menu.item.active.bg.\\1.\\2"]),
+        (_RE_MENU_BG, ["menu.item.bg.\\1.\\2"]),
     ],
     "pause menu": [
-        (re.compile(r"^menu\.bg\.active\.(.+)\.(anim|spr|offset|facing|scale|xshear|angle|layerno|window|localcoord)$", re.IGNORECASE), ["menu.item.active.bg.\\1.\\2"]),
-        (re.compile(r"^menu\.bg\.(.+)\.(anim|spr|offset|facing|scale|xshear|angle|layerno|window|localcoord)$", re.IGNORECASE), ["menu.item.bg.\\1.\\2"]),
+        (_RE_MENU_BG_ACTIVE, ["menu.item.active.bg.\\1.\\2"]),
+        (_RE_MENU_BG, ["menu.item.bg.\\1.\\2"]),
     ],
     "training pause menu": [
-        (re.compile(r"^menu\.bg\.active\.(.+)\.(anim|spr|offset|facing|scale|xshear|angle|layerno|window|localcoord)$", re.IGNORECASE), ["menu.item.active.bg.\\1.\\2"]),
-        (re.compile(r"^menu\.bg\.(.+)\.(anim|spr|offset|facing|scale|xshear|angle|layerno|window|localcoord)$", re.IGNORECASE), ["menu.item.bg.\\1.\\2"]),
-
-        (re.compile(r"^menu\.valuename\.dummycontrol\.(cooperative|ai|manual)$", re.IGNORECASE), ["menu.valuename.dummycontrol_\\1"]),
-        (re.compile(r"^menu\.valuename\.ailevel\.([1-8])$", re.IGNORECASE), ["menu.valuename.ailevel_\\1"]),
-        (re.compile(r"^menu\.valuename\.guardmode\.(none|auto)$", re.IGNORECASE), ["menu.valuename.guardmode_\\1"]),
-        (re.compile(r"^menu\.valuename\.dummymode\.(stand|crouch|jump|wjump)$", re.IGNORECASE), ["menu.valuename.dummymode_\\1"]),
-        (re.compile(r"^menu\.valuename\.distance\.(any|close|medium|far)$", re.IGNORECASE), ["menu.valuename.distance_\\1"]),
-        (re.compile(r"^menu\.valuename\.buttonjam\.(none|a|b|c|x|y|z|s|d|w)$", re.IGNORECASE), ["menu.valuename.buttonjam_\\1"]),
+        (_RE_MENU_BG_ACTIVE, ["menu.item.active.bg.\\1.\\2"]),
+        (_RE_MENU_BG, ["menu.item.bg.\\1.\\2"]),
+
+        (re.compile(r"^menu\.valuename\.dummycontrol\.(cooperative|ai|manual)$"), ["menu.valuename.dummycontrol_\\1"]),
+        (re.compile(r"^menu\.valuename\.ailevel\.([1-8])$"), ["menu.valuename.ailevel_\\1"]),
+        (re.compile(r"^menu\.valuename\.guardmode\.(none|auto)$"), ["menu.valuename.guardmode_\\1"]),
+        (re.compile(r"^menu\.valuename\.dummymode\.(stand|crouch|jump|wjump)$"), ["menu.valuename.dummymode_\\1"]),
+        (re.compile(r"^menu\.valuename\.distance\.(any|close|medium|far)$"), ["menu.valuename.distance_\\1"]),
+        (re.compile(r"^menu\.valuename\.buttonjam\.(none|a|b|c|x|y|z|s|d|w)$"), ["menu.valuename.buttonjam_\\1"]),
     ],
     "attract mode": [
-        (re.compile(r"^menu\.bg\.active\.(.+)\.(anim|spr|offset|facing|scale|xshear|angle|layerno|window|localcoord)$", re.IGNORECASE), ["menu.item.active.bg.\\1.\\2"]),
-        (re.compile(r"^menu\.bg\.(.+)\.(anim|spr|offset|facing|scale|xshear|angle|layerno|window|localcoord)$", re.IGNORECASE), ["menu.item.bg.\\1.\\2"]),
+        (_RE_MENU_BG_ACTIVE, ["menu.item.active.bg.\\1.\\2"]),
+        (_RE_MENU_BG, ["menu.item.bg.\\1.\\2"]),
 
-        (re.compile(r"^menu\.accept\.key$", re.IGNORECASE), ["menu.done.key"]),
-        (re.compile(r"^options\.key$", re.IGNORECASE), ["options.keycode"]),
+        (re.compile(r"^menu\.accept\.key$"), ["menu.done.key"]),
+        (re.compile(r"^options\.key$"), ["options.keycode"]),
     ],
     "challenger info": [
-        (re.compile(r"^text$", re.IGNORECASE), ["text.text"]),
+        (re.compile(r"^text$"), ["text.text"]),
     ],
     "continue screen": [
-        (re.compile(r"^accept\.key$", re.IGNORECASE), ["done.key"]),
+        (re.compile(r"^accept\.key$"), ["done.key"]),
     ],
     "dialogue info": [
-        (re.compile(r"^p([12])\.text\.spacing$", re.IGNORECASE), ["p\\1.text.textspacing"]),
-        (re.compile(r"^p([12])\.text\.delay$", re.IGNORECASE), ["p\\1.text.textdelay"]),
+        (re.compile(r"^p([12])\.text\.spacing$"), ["p\\1.text.textspacing"]),
+        (re.compile(r"^p([12])\.text\.delay$"), ["p\\1.text.textdelay"]),
     ],
     "hiscore info": [
-        (re.compile(r"^item\.data\.(.+)$", re.IGNORECASE), ["item.result.\\1"]),
-        (re.compile(r"^title\.data\.(.+)$", re.IGNORECASE), ["title.result.\\1"]),
+        (re.compile(r"^item\.data\.(.+)$"), ["item.result.\\1"]),
+        (re.compile(r"^title\.data\.(.+)$"), ["title.result.\\1"]),
 
-        (re.compile(r"^accept\.key$", re.IGNORECASE), ["done.key"]),
+        (re.compile(r"^accept\.key$"), ["done.key"]),
     ],
 }
 
+# The run of literal characters (letters, digits, '_' and escaped dots) a
+# pattern body starts with.
+_RE_LITERAL_RUN = re.compile(r"(?:[a-z0-9_]|\\\.)*")
+
+def _literal_prefix(body: str) -> str:
+    """
+    Return the literal text every key matched by pattern `body` starts with,
+    e.g. "menu.bg." for r"menu\.bg\.(.+)". Returns "" when there is none,
+    including for bodies with a top-level '|'.
+    """
+    depth = 0
+    escaped = False
+    for c in body:
+        if escaped:
+            escaped = False
+        elif c == "\\":
+            escaped = True
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c == "|" and depth == 0:
+            return ""
+    run = _RE_LITERAL_RUN.match(body).group()
+    if body[len(run):len(run) + 1] in ("?", "*", "{") and run:
+        # The last literal is optional or repeated.
+        run = run[:-2] if run.endswith("\\.") else run[:-1]
+    return run.replace("\\.", ".")
+
+def _compile_rule_union(key_patterns):
+    """
+    Combine a section's anchored key patterns into one alternation
+    (?P<r0>...)|(?P<r1>...)|... so a single match() tells which rule fired.
+
+    Returns (union_regex, group_to_rule, prefixes) where group_to_rule
+    maps the group number reported by match.lastindex to the index of the
+    rule in the original list. Alternatives are tried in list order, so the
+    first matching rule wins exactly as in a linear scan. prefixes is a
+    tuple of literal prefixes (see _literal_prefix()), one of which every
+    matching key starts with, so key_lc.startswith(prefixes) rejects most
+    keys without running the union at all. It is ("",) if some pattern has
+    no literal prefix.
+
+    The union is compiled without re.IGNORECASE and must be matched against
+    _match_key() of the key; rule patterns are therefore written in lowercase.
+    """
+    parts = []
+    prefixes = set()
+    for i, pattern in enumerate(key_patterns):
+        body = pattern.pattern
+        if body.startswith("^"):
+            body = body[1:]
+        if body.endswith("$") and not body.endswith("\\$"):
+            body = body[:-1]
+        parts.append(f"(?P<r{i}>{body})")
+        prefixes.add(_literal_prefix(body))
+    union = re.compile("^(?:" + "|".join(parts) + ")$")
+    group_to_rule = {union.groupindex[f"r{i}"]: i for i in range(len(parts))}
+    # Drop prefixes that extend a shorter one; the shorter one covers them.
+    prefixes = tuple(
+        prefix for prefix in sorted(prefixes)
+        if not any(prefix.startswith(other) for other in prefixes if other != prefix)
+    ) or ("",)
+    return union, group_to_rule, prefixes
+
+# Group references ("\1", "\g<1>", "\g<name>") and other escapes in a
+# replacement template.
+_RE_TEMPLATE_ESCAPE = re.compile(r"\\(?:g<([^>]*)>|([1-9][0-9]?)|(.))", re.DOTALL)
+
+def _compile_template(template: str, pattern):
+    """
+    Split a transformation replacement template into a tuple of literal
+    strings and group numbers of `pattern`, so new keys can be joined from
+    the match without Match.expand() re-parsing the template every time.
+    A template without group references is returned unchanged as a str,
+    to be used verbatim. Returns None for templates using any other
+    escape; those are still expanded with Match.expand().
+    """
+    parts = []
+    pos = 0
+    for m in _RE_TEMPLATE_ESCAPE.finditer(template):
+        if m.group(3) is not None:
+            return None
+        ref = m.group(1) if m.group(1) is not None else m.group(2)
+        group = int(ref) if ref.isdigit() else pattern.groupindex.get(ref)
+        if group is None or group > pattern.groups:
+            return None
+        if m.start() > pos:
+            parts.append(template[pos:m.start()])
+        parts.append(group)
+        pos = m.end()
+    if pos == 0:
+        return template
+    if pos < len(template):
+        parts.append(template[pos:])
+    return tuple(parts)
+
+def _expand_template(parts, m):
+    """Build the text for compiled template `parts` from match `m`."""
+    return "".join([p if type(p) is str else (m.group(p) or "") for p in parts])
+
+def _expand_template_spans(parts, um, rule_group, key):
+    """
+    Build the text for compiled template `parts` from union match `um`,
+    where the rule's group 0 is group `rule_group` of the union. Captures
+    are taken from `key` at the matched spans (a group that didn't take
+    part spans (-1, -1), which slices to "").
+    """
+    out = []
+    for p in parts:
+        if type(p) is str:
+            out.append(p)
+        else:
+            start, end = um.span(rule_group + p)
+            out.append(key[start:end])
+    return "".join(out)
+
+# Anchored patterns that spell out one exact key, e.g. r"^p2\.accept\.key$".
+_RE_LITERAL_KEY_PATTERN = re.compile(r"^\^((?:[a-z0-9_]|\\\.)+)\$$")
+
+def _literal_key_of(pattern):
+    """
+    Return the exact lowercase key a pattern matches if it is a plain literal
+    (only letters, digits, '_' and escaped dots), else None.
+    """
+    m = _RE_LITERAL_KEY_PATTERN.match(pattern.pattern)
+    return m.group(1).replace("\\.", ".") if m else None
+
+class _SectionRules:
+    """
+    Every rule table entry for one section, gathered so that per-line code
+    needs a single _SECTION_TABLE lookup instead of one per table.
+
+    delete/modify/transform are the section's keys_to_delete,
+    value_modifications and transformations lists, each paired with the
+    (union_regex, group_to_rule) built by _compile_rule_union() (None when
+    the list is empty). transform_templates holds each transformation's
+    replacements as compiled by _compile_template(), in the same order.
+    Literal delete patterns are pulled out into the
+    delete_literals set instead, so only real patterns reach delete_union.
+    append holds the append_if_missing entries as (key_lc, key, value)
+    tuples, rename the new name from SECTION_RENAMES and case the
+    SECTION_CANONICAL_CASE spelling of the section as written (after
+    renaming), so a section header needs only its own entry.
+
+    Consecutive value_modifications rules never share a key pattern, so
+    modify is not grouped by key_rx: after the union picks the first rule,
+    each later rule needs its own key match anyway.
+    """
+    __slots__ = (
+        "delete", "delete_literals", "delete_union",
+        "modify", "modify_union",
+        "transform", "transform_union", "transform_templates",
+        "append", "rename", "case",
+    )
+
+    def __init__(self, section: str):
+        self.delete = keys_to_delete.get(section, ())
+        self.modify = value_modifications.get(section, ())
+        self.transform = transformations.get(section, ())
+        literals = set()
+        delete_patterns = []
+        for pattern in self.delete:
+            literal = _literal_key_of(pattern)
+            if literal is not None:
+                literals.add(literal)
+            else:
+                delete_patterns.append(pattern)
+        self.delete_literals = frozenset(literals)
+        self.delete_union = _compile_rule_union(delete_patterns) if delete_patterns else None
+        self.modify_union = (
+            _compile_rule_union([key_rx for key_rx, _, _ in self.modify])
+            if self.modify else None
+        )
+        self.transform_union = (
+            _compile_rule_union([pattern for pattern, _ in self.transform])
+            if self.transform else None
+        )
+        self.transform_templates = tuple(
+            tuple(_compile_template(rep, pattern) for rep in replacements)
+            for pattern, replacements in self.transform
+        )
+        self.append = tuple(
+            (str(k).strip().lower(), str(k), str(v))
+            for k, v in append_if_missing.get(section, {}).items()
+        )
+        self.rename = SECTION_RENAMES.get(section)
+        self.case = SECTION_CANONICAL_CASE.get(self.rename or section)
+
+# Section table keys are interned, and so is the current section name in
+# process_ini(), so lookups and the comparisons against the names below
+# succeed on the identity check. ("info" needs no constant: identifier-like
+# literals are interned by the compiler already.)
+_SECTION_TABLE = {
+    sys.intern(section): _SectionRules(section)
+    for section in (
+        set(keys_to_delete) | set(value_modifications) | set(transformations)
+        | set(append_if_missing) | set(SECTION_RENAMES) | set(SECTION_CANONICAL_CASE)
+    )
+}
+_EMPTY_RULES = _SectionRules("")
+_SELECT_INFO = sys.intern("select info")
+_HISCORE_INFO = sys.intern("hiscore info")
+_VS_SCREEN = sys.intern("vs screen")
+
+class _MemberSlot:
+    """
+    Pending base/member values for one (section, base_player, kind) group in
+    _member_offset_params / _member_scale_params: the base (x, y), member
+    overrides keyed by member index, and the anchor token the aggregated
+    lines are emitted at.
+    """
+    __slots__ = ("base", "members", "anchor")
+    def __init__(self):
+        self.base = None
+        self.members = {}
+        self.anchor = None
+
+class _VelocitySlot:
+    """
+    Pending slide.speed for one (section, base_player, kind) group in
+    _velocity_params: the (x, y) value and the anchor token the velocity
+    line is emitted at.
+    """
+    __slots__ = ("v", "anchor")
+    def __init__(self):
+        self.v = None
+        self.anchor = None
+
 _member_offset_params = {}
 _member_scale_params = {}
+# Recorded facings, {section: {(base_player, kind): facing}}.
 _facing_params = {}
+# Recorded slide.speeds, {section: {(base_player, kind): _VelocitySlot}}.
 _velocity_params = {}
 _PLAYER_MEMBER_MAP = {1: [1, 3, 5, 7], 2: [2, 4, 6, 8]}
-
-class _AnchorToken:
-    """
-    Internal placeholder used to mark where section-flush generated lines
-    (aggregated offsets/scales/velocities) should be inserted.
-    """
-    __slots__ = ("id",)
-    def __init__(self, id_: int):
-        self.id = id_
-
+# Sections whose member offsets/scales, facings and slide.speeds are
+# aggregated. Section names passed to the record/flush helpers are the
+# already lowercased names from process_ini().
+_MEMBER_SECTIONS = frozenset(("select info", "vs screen", "victory screen"))
+# Member indices in emission order (pX.memberN, N is 1-4 in _RE_MEMBER_PARAM).
+_MEMBER_INDICES = (1, 2, 3, 4)
+
+# Anchor tokens are internal placeholders stored in the section buffer to mark
+# where section-flush generated lines (aggregated offsets/scales/velocities)
+# should be inserted. They are plain negative ints, which can never be
+# confused with the str lines around them.
 _anchor_counter = 0
-def _new_anchor_token() -> _AnchorToken:
+def _new_anchor_token() -> int:
     global _anchor_counter
     _anchor_counter += 1
-    return _AnchorToken(_anchor_counter)
+    return -_anchor_counter
 
 def _is_trailing_comment_or_blank_line(item) -> bool:
     """
@@ -322,78 +667,91 @@ def _is_trailing_comment_or_blank_line(item) -> bool:
     Used to insert append_if_missing lines before "tail comments" that often
     belong to the next section header.
     """
-    if isinstance(item, _AnchorToken):
+    if isinstance(item, int):
         return False
-    s = str(item)
-    st = s.strip()
-    return st == "" or st.startswith(";")
+    s = item if isinstance(item, str) else str(item)
+    # Find the first non-whitespace character without building a stripped copy.
+    i = 0
+    n = len(s)
+    while i < n and s[i].isspace():
+        i += 1
+    return i == n or s[i] == ";"
+
+def _float_or_default(text: str, default: float) -> float:
+    """
+    Parse one stripped pair component; empty or invalid text yields `default`.
+    """
+    text = text.strip()
+    if not text:
+        return default
+    try:
+        return float(text)
+    except ValueError:
+        return default
 
+@lru_cache(maxsize=2048)
 def _parse_xy_pair(value_str: str):
     """
     Parse 'x, y' into a tuple of floats (x, y). Missing or invalid components
     are treated as 0.0.
     """
-    parts = [p.strip() for p in str(value_str).split(",")]
-    x_str = parts[0] if len(parts) > 0 and parts[0] != "" else "0"
-    y_str = parts[1] if len(parts) > 1 and parts[1] != "" else "0"
-    try:
-        x = float(x_str)
-    except (TypeError, ValueError):
-        x = 0.0
-    try:
-        y = float(y_str)
-    except (TypeError, ValueError):
-        y = 0.0
-    return x, y
+    s = value_str if isinstance(value_str, str) else str(value_str)
+    x_str, _, rest = s.partition(",")
+    y_str = rest.partition(",")[0]
+    return _float_or_default(x_str, 0.0), _float_or_default(y_str, 0.0)
 
 
+@lru_cache(maxsize=2048)
 def _parse_scale_pair(value_str: str):
     """
     Parse 'x, y' into a tuple of floats (x, y) for scale values.
     Missing or invalid components are treated as 1.0 (scale default).
     """
-    parts = [p.strip() for p in str(value_str).split(",")]
-    x_str = parts[0] if len(parts) > 0 and parts[0] != "" else "1"
-    y_str = parts[1] if len(parts) > 1 and parts[1] != "" else "1"
-    try:
-        x = float(x_str)
-    except (TypeError, ValueError):
-        x = 1.0
-    try:
-        y = float(y_str)
-    except (TypeError, ValueError):
-        y = 1.0
-    return x, y
+    s = value_str if isinstance(value_str, str) else str(value_str)
+    x_str, _, rest = s.partition(",")
+    y_str = rest.partition(",")[0]
+    return _float_or_default(x_str, 1.0), _float_or_default(y_str, 1.0)
+
+# pX[.memberY][.face|.face2].(offset|scale|facing), classified with one match
+# by _match_member_param().
+# Matched against the lowercased key.
+_RE_MEMBER_PARAM = re.compile(
+    r"^p(?P<p>[0-9]+)(?:\.member(?P<m>[1-4]))?(?:\.(?P<kind>face2?))?"
+    r"\.(?P<attr>offset|scale|facing)$"
+)
+
+def _match_member_param(key_lc: str, attr: str):
+    """
+    Match the lowercased key key_lc against _RE_MEMBER_PARAM and return
+    (player_digits, member_index, kind) if its attribute is `attr`, else None.
+    player_digits is the raw player number text, member_index is None for
+    base (non-member) keys and kind is one of "face", "face2", "plain".
+    """
+    m = _RE_MEMBER_PARAM.match(key_lc)
+    if m is None or m.group("attr") != attr:
+        return None
+    member = m.group("m")
+    kind = m.group("kind")
+    return (
+        m.group("p"),
+        int(member) if member is not None else None,
+        kind if kind is not None else "plain",
+    )
 
-def _record_facing_param(section: str, orig_key: str, value: str) -> None:
+def _record_facing_param(section: str, orig_key: str, key_lc: str, value: str) -> None:
     """
     Record facing values (pX.facing, pX.face.facing, pX.face2.facing) so that
     slide.speed can later be converted into velocity with the correct sign.
     """
-    sec = (section or "").lower()
-    if sec not in ("select info", "vs screen", "victory screen"):
+    if section not in _MEMBER_SECTIONS:
         return
 
-    base_player = None
-    kind = None  # "face", "face2", "plain"
-
-    m = re.match(r"^p([0-9]+)\.face\.facing$", orig_key, flags=re.IGNORECASE)
-    if m:
-        base_player = int(m.group(1))
-        kind = "face"
-    else:
-        m = re.match(r"^p([0-9]+)\.face2\.facing$", orig_key, flags=re.IGNORECASE)
-        if m:
-            base_player = int(m.group(1))
-            kind = "face2"
-        else:
-            m = re.match(r"^p([0-9]+)\.facing$", orig_key, flags=re.IGNORECASE)
-            if m:
-                base_player = int(m.group(1))
-                kind = "plain"
-
-    if base_player is None or kind is None:
+    parsed = _match_member_param(key_lc, "facing")
+    # Facing has no member variants.
+    if parsed is None or parsed[1] is not None:
         return
+    base_player = int(parsed[0])
+    kind = parsed[2]
 
     first = str(value).split(",")[0].strip()
     try:
@@ -401,14 +759,13 @@ def _record_facing_param(section: str, orig_key: str, value: str) -> None:
     except ValueError:
         facing = 1.0
 
-    key = (sec, base_player, kind)
-    _facing_params[key] = facing
-    print(
-        f"[{section}] Recorded facing for {orig_key}: {facing}",
-        file=sys.stderr,
+    _facing_params.setdefault(section, {})[(base_player, kind)] = facing
+    log.debug(
+        "[%s] Recorded facing for %s: %s",
+        section, orig_key, facing,
     )
 
-def _record_member_offset_param(section: str, orig_key: str, value: str):
+def _record_member_offset_param(section: str, orig_key: str, key_lc: str, value: str):
     """
     Record base/member offsets so they can be aggregated later.
 
@@ -424,86 +781,36 @@ def _record_member_offset_param(section: str, orig_key: str, value: str):
     The original lines are DROPPED from output; final aggregated offsets
     are emitted by _flush_member_offsets_for_section().
     """
-    sec = (section or "").lower()
-
     # Only aggregate member offsets in sections that support member mapping.
-    if sec not in ("select info", "vs screen", "victory screen"):
+    if section not in _MEMBER_SECTIONS:
         return (False, None)
 
-    base_player = None
-    member_index = None
-    kind = None  # "face", "face2", "plain"
-
-    # Base offsets ----------------------------------------------------------
-    m = re.match(r"^p([12])\.face\.offset$", orig_key, flags=re.IGNORECASE)
-    if m:
-        base_player = int(m.group(1))
-        kind = "face"
-    else:
-        m = re.match(r"^p([12])\.face2\.offset$", orig_key, flags=re.IGNORECASE)
-        if m:
-            base_player = int(m.group(1))
-            kind = "face2"
-        else:
-            m = re.match(r"^p([12])\.offset$", orig_key, flags=re.IGNORECASE)
-            if m:
-                base_player = int(m.group(1))
-                kind = "plain"
-
-    # Member offsets --------------------------------------------------------
-    if base_player is None:
-        m = re.match(
-            r"^p([12])\.member([1-4])\.face\.offset$",
-            orig_key,
-            flags=re.IGNORECASE,
-        )
-        if m:
-            base_player = int(m.group(1))
-            member_index = int(m.group(2))
-            kind = "face"
-        else:
-            m = re.match(
-                r"^p([12])\.member([1-4])\.face2\.offset$",
-                orig_key,
-                flags=re.IGNORECASE,
-            )
-            if m:
-                base_player = int(m.group(1))
-                member_index = int(m.group(2))
-                kind = "face2"
-            else:
-                m = re.match(
-                    r"^p([12])\.member([1-4])\.offset$",
-                    orig_key,
-                    flags=re.IGNORECASE,
-                )
-                if m:
-                    base_player = int(m.group(1))
-                    member_index = int(m.group(2))
-                    kind = "plain"
-
-    if base_player is None or kind is None:
+    parsed = _match_member_param(key_lc, "offset")
+    # Only p1 / p2 have team members to aggregate.
+    if parsed is None or parsed[0] not in ("1", "2"):
         return (False, None)
+    base_player = int(parsed[0])
+    member_index, kind = parsed[1], parsed[2]
 
     x, y = _parse_xy_pair(value)
-    key = (sec, base_player, kind)
-    slot = _member_offset_params.setdefault(
-        key, {"base": None, "members": {}, "anchor": None}
-    )
+    bucket = _member_offset_params.setdefault(section, {})
+    slot = bucket.get((base_player, kind))
+    if slot is None:
+        slot = bucket[(base_player, kind)] = _MemberSlot()
 
     if member_index is None:
-        slot["base"] = (x, y)
+        slot.base = (x, y)
     else:
-        slot["members"][member_index] = (x, y)
+        slot.members[member_index] = (x, y)
 
     anchor = None
-    if slot.get("anchor") is None:
-        slot["anchor"] = _new_anchor_token()
-        anchor = slot["anchor"]
+    if slot.anchor is None:
+        slot.anchor = _new_anchor_token()
+        anchor = slot.anchor
 
-    print(
-        f"[{section}] Recorded offset for {orig_key}: ({x}, {y})",
-        file=sys.stderr,
+    log.debug(
+        "[%s] Recorded offset for %s: (%s, %s)",
+        section, orig_key, x, y,
     )
     return (True, anchor)
 
@@ -523,34 +830,33 @@ def _flush_member_offsets_for_section(section: str):
     """
     if not section:
         return ({}, [])
-    sec = section.lower()
 
     # Only aggregate offsets in these sections
-    if sec not in ("select info", "vs screen", "victory screen"):
+    if section not in _MEMBER_SECTIONS:
+        return ({}, [])
+
+    # Popping the section's bucket also ensures a repeated section name
+    # doesn't flush the same entries twice.
+    bucket = _member_offset_params.pop(section, None)
+    if not bucket:
         return ({}, [])
 
     anchor_map = {}
     append_lines = []
 
-    for (s, base_player, kind), data in list(_member_offset_params.items()):
-        if s != sec:
-            continue
-
-        base_off = data.get("base")
-        members = data.get("members", {})
-
-        # Decide which members need final lines.
-        member_indices = set(members.keys())
-        # Always keep a pX.*.offset for member1 if there was either a base
-        # value or an explicit member1 override.
-        if base_off is not None or 1 in member_indices:
-            member_indices.add(1)
+    for (base_player, kind), data in bucket.items():
 
-        if not member_indices:
-            del _member_offset_params[(s, base_player, kind)]
-            continue
+        base_off = data.base
+        members = data.members
 
-        for member_idx in sorted(member_indices):
+        # Only members with an explicit override need final lines, except
+        # that a pX.*.offset for member1 is always kept if there was a base
+        # value.
+        for member_idx in _MEMBER_INDICES:
+            if member_idx not in members and not (
+                member_idx == 1 and base_off is not None
+            ):
+                continue
             target_players = _PLAYER_MEMBER_MAP[base_player]
             new_player = target_players[member_idx - 1]
 
@@ -568,34 +874,31 @@ def _flush_member_offsets_for_section(section: str):
 
             off_str = f"{fx:g}, {fy:g}"
             lines = []
-            if sec in ("select info", "vs screen"):
-                print(
-                    f"[{section}] Aggregated offset: base p{base_player} "
-                    f"{kind} member{member_idx} -> {base_key}.offset/.done.offset = {off_str}",
-                    file=sys.stderr,
+            if section in (_SELECT_INFO, _VS_SCREEN):
+                log.debug(
+                    "[%s] Aggregated offset: base p%s "
+                    "%s member%s -> %s.offset/.done.offset = %s",
+                    section, base_player, kind, member_idx, base_key, off_str,
                 )
                 lines.append(f"{base_key}.offset = {off_str}")
                 lines.append(f"{base_key}.done.offset = {off_str}")
             else:
                 # Victory Screen: no .done variants
-                print(
-                    f"[{section}] Aggregated offset: base p{base_player} "
-                    f"{kind} member{member_idx} -> {base_key}.offset = {off_str}",
-                    file=sys.stderr,
+                log.debug(
+                    "[%s] Aggregated offset: base p%s "
+                    "%s member%s -> %s.offset = %s",
+                    section, base_player, kind, member_idx, base_key, off_str,
                 )
                 lines.append(f"{base_key}.offset = {off_str}")
 
-            anchor = data.get("anchor")
+            anchor = data.anchor
             if anchor is not None:
                 anchor_map.setdefault(anchor, []).extend(lines)
             else:
                 append_lines.extend(lines)
-
-        # Remove so we don't flush twice if the same section name repeats.
-        del _member_offset_params[(s, base_player, kind)]
     return (anchor_map, append_lines)
 
-def _record_member_scale_param(section: str, orig_key: str, value: str):
+def _record_member_scale_param(section: str, orig_key: str, key_lc: str, value: str):
     """
     Record base/member scales so they can be aggregated later.
 
@@ -611,86 +914,36 @@ def _record_member_scale_param(section: str, orig_key: str, value: str):
     The original lines are DROPPED from output; final aggregated scales
     are emitted by _flush_member_scales_for_section().
     """
-    sec = (section or "").lower()
-
     # Only aggregate member scales in sections that support member mapping.
-    if sec not in ("select info", "vs screen", "victory screen"):
+    if section not in _MEMBER_SECTIONS:
         return (False, None)
 
-    base_player = None
-    member_index = None
-    kind = None  # "face", "face2", "plain"
-
-    # Base scales -----------------------------------------------------------
-    m = re.match(r"^p([12])\.face\.scale$", orig_key, flags=re.IGNORECASE)
-    if m:
-        base_player = int(m.group(1))
-        kind = "face"
-    else:
-        m = re.match(r"^p([12])\.face2\.scale$", orig_key, flags=re.IGNORECASE)
-        if m:
-            base_player = int(m.group(1))
-            kind = "face2"
-        else:
-            m = re.match(r"^p([12])\.scale$", orig_key, flags=re.IGNORECASE)
-            if m:
-                base_player = int(m.group(1))
-                kind = "plain"
-
-    # Member scales ---------------------------------------------------------
-    if base_player is None:
-        m = re.match(
-            r"^p([12])\.member([1-4])\.face\.scale$",
-            orig_key,
-            flags=re.IGNORECASE,
-        )
-        if m:
-            base_player = int(m.group(1))
-            member_index = int(m.group(2))
-            kind = "face"
-        else:
-            m = re.match(
-                r"^p([12])\.member([1-4])\.face2\.scale$",
-                orig_key,
-                flags=re.IGNORECASE,
-            )
-            if m:
-                base_player = int(m.group(1))
-                member_index = int(m.group(2))
-                kind = "face2"
-            else:
-                m = re.match(
-                    r"^p([12])\.member([1-4])\.scale$",
-                    orig_key,
-                    flags=re.IGNORECASE,
-                )
-                if m:
-                    base_player = int(m.group(1))
-                    member_index = int(m.group(2))
-                    kind = "plain"
-
-    if base_player is None or kind is None:
+    parsed = _match_member_param(key_lc, "scale")
+    # Only p1 / p2 have team members to aggregate.
+    if parsed is None or parsed[0] not in ("1", "2"):
         return (False, None)
+    base_player = int(parsed[0])
+    member_index, kind = parsed[1], parsed[2]
 
     x, y = _parse_scale_pair(value)
-    key = (sec, base_player, kind)
-    slot = _member_scale_params.setdefault(
-        key, {"base": None, "members": {}, "anchor": None}
-    )
+    bucket = _member_scale_params.setdefault(section, {})
+    slot = bucket.get((base_player, kind))
+    if slot is None:
+        slot = bucket[(base_player, kind)] = _MemberSlot()
 
     if member_index is None:
-        slot["base"] = (x, y)
+        slot.base = (x, y)
     else:
-        slot["members"][member_index] = (x, y)
+        slot.members[member_index] = (x, y)
 
     anchor = None
-    if slot.get("anchor") is None:
-        slot["anchor"] = _new_anchor_token()
-        anchor = slot["anchor"]
+    if slot.anchor is None:
+        slot.anchor = _new_anchor_token()
+        anchor = slot.anchor
 
-    print(
-        f"[{section}] Recorded scale for {orig_key}: ({x}, {y})",
-        file=sys.stderr,
+    log.debug(
+        "[%s] Recorded scale for %s: (%s, %s)",
+        section, orig_key, x, y,
     )
     return (True, anchor)
 
@@ -710,34 +963,33 @@ def _flush_member_scales_for_section(section: str):
     """
     if not section:
         return ({}, [])
-    sec = section.lower()
 
     # Only aggregate scales in these sections
-    if sec not in ("select info", "vs screen", "victory screen"):
+    if section not in _MEMBER_SECTIONS:
+        return ({}, [])
+
+    # Popping the section's bucket also ensures a repeated section name
+    # doesn't flush the same entries twice.
+    bucket = _member_scale_params.pop(section, None)
+    if not bucket:
         return ({}, [])
 
     anchor_map = {}
     append_lines = []
 
-    for (s, base_player, kind), data in list(_member_scale_params.items()):
-        if s != sec:
-            continue
-
-        base_scale = data.get("base")
-        members = data.get("members", {})
-
-        # Decide which members need final lines.
-        member_indices = set(members.keys())
-        # Always keep a pX.*.scale for member1 if there was either a base
-        # value or an explicit member1 override.
-        if base_scale is not None or 1 in member_indices:
-            member_indices.add(1)
+    for (base_player, kind), data in bucket.items():
 
-        if not member_indices:
-            del _member_scale_params[(s, base_player, kind)]
-            continue
+        base_scale = data.base
+        members = data.members
 
-        for member_idx in sorted(member_indices):
+        # Only members with an explicit override need final lines, except
+        # that a pX.*.scale for member1 is always kept if there was a base
+        # value.
+        for member_idx in _MEMBER_INDICES:
+            if member_idx not in members and not (
+                member_idx == 1 and base_scale is not None
+            ):
+                continue
             target_players = _PLAYER_MEMBER_MAP[base_player]
             new_player = target_players[member_idx - 1]
 
@@ -755,34 +1007,39 @@ def _flush_member_scales_for_section(section: str):
 
             scale_str = f"{fx:g}, {fy:g}"
             lines = []
-            if sec in ("select info", "vs screen"):
-                print(
-                    f"[{section}] Aggregated scale: base p{base_player} "
-                    f"{kind} member{member_idx} -> {base_key}.scale/.done.scale = {scale_str}",
-                    file=sys.stderr,
+            if section in (_SELECT_INFO, _VS_SCREEN):
+                log.debug(
+                    "[%s] Aggregated scale: base p%s "
+                    "%s member%s -> %s.scale/.done.scale = %s",
+                    section, base_player, kind, member_idx, base_key, scale_str,
                 )
                 lines.append(f"{base_key}.scale = {scale_str}")
                 lines.append(f"{base_key}.done.scale = {scale_str}")
             else:
                 # Victory Screen: no .done variants
-                print(
-                    f"[{section}] Aggregated scale: base p{base_player} "
-                    f"{kind} member{member_idx} -> {base_key}.scale = {scale_str}",
-                    file=sys.stderr,
+                log.debug(
+                    "[%s] Aggregated scale: base p%s "
+                    "%s member%s -> %s.scale = %s",
+                    section, base_player, kind, member_idx, base_key, scale_str,
                 )
                 lines.append(f"{base_key}.scale = {scale_str}")
 
-            anchor = data.get("anchor")
+            anchor = data.anchor
             if anchor is not None:
                 anchor_map.setdefault(anchor, []).extend(lines)
             else:
                 append_lines.extend(lines)
-
-        # Remove so we don't flush twice if the same section name repeats.
-        del _member_scale_params[(s, base_player, kind)]
     return (anchor_map, append_lines)
 
-def _record_velocity_param(section: str, orig_key: str, value: str):
+_RE_SLIDE_SPEED = re.compile(r"^p([0-9]+)(?:\.(face2?))?\.slide\.speed$")
+# Which slide.speed kinds ("face", "face2", "plain") each section supports.
+_SLIDE_SPEED_KINDS = {
+    "select info": ("face", "face2"),
+    "vs screen": ("plain", "face2"),
+    "victory screen": ("plain", "face2"),
+}
+
+def _record_velocity_param(section: str, orig_key: str, key_lc: str, value: str):
     """
     Record slide.speed entries so they can be converted into velocity at
     section flush time, after we know the relevant facing.
@@ -795,50 +1052,32 @@ def _record_velocity_param(section: str, orig_key: str, value: str):
     The original lines are DROPPED from output; final velocities are
     emitted by _flush_velocity_for_section().
     """
-    sec = (section or "").lower()
-    if sec not in ("select info", "vs screen", "victory screen"):
+    if section not in _SLIDE_SPEED_KINDS:
         return (False, None)
 
-    base_player = None
-    kind = None  # "face", "face2", "plain"
-
-    if sec == "select info":
-        m = re.match(r"^p([0-9]+)\.face\.slide\.speed$", orig_key, flags=re.IGNORECASE)
-        if m:
-            base_player = int(m.group(1))
-            kind = "face"
-        else:
-            m = re.match(r"^p([0-9]+)\.face2\.slide\.speed$", orig_key, flags=re.IGNORECASE)
-            if m:
-                base_player = int(m.group(1))
-                kind = "face2"
-    else:
-        m = re.match(r"^p([0-9]+)\.slide\.speed$", orig_key, flags=re.IGNORECASE)
-        if m:
-            base_player = int(m.group(1))
-            kind = "plain"
-        else:
-            m = re.match(r"^p([0-9]+)\.face2\.slide\.speed$", orig_key, flags=re.IGNORECASE)
-            if m:
-                base_player = int(m.group(1))
-                kind = "face2"
-
-    if base_player is None or kind is None:
+    m = _RE_SLIDE_SPEED.match(key_lc)
+    if not m:
+        return (False, None)
+    kind = m.group(2) or "plain"
+    if kind not in _SLIDE_SPEED_KINDS[section]:
         return (False, None)
+    base_player = int(m.group(1))
 
     vx, vy = _parse_xy_pair(value)
-    key = (sec, base_player, kind)
-    slot = _velocity_params.setdefault(key, {"v": None, "anchor": None})
-    slot["v"] = (vx, vy)
+    bucket = _velocity_params.setdefault(section, {})
+    slot = bucket.get((base_player, kind))
+    if slot is None:
+        slot = bucket[(base_player, kind)] = _VelocitySlot()
+    slot.v = (vx, vy)
 
     anchor = None
-    if slot.get("anchor") is None:
-        slot["anchor"] = _new_anchor_token()
-        anchor = slot["anchor"]
+    if slot.anchor is None:
+        slot.anchor = _new_anchor_token()
+        anchor = slot.anchor
 
-    print(
-        f"[{section}] Recorded slide.speed for {orig_key}: ({vx}, {vy})",
-        file=sys.stderr,
+    log.debug(
+        "[%s] Recorded slide.speed for %s: (%s, %s)",
+        section, orig_key, vx, vy,
     )
     return (True, anchor)
 
@@ -851,33 +1090,36 @@ def _flush_velocity_for_section(section: str):
     """
     if not section:
         return ({}, [])
-    sec = section.lower()
-    if sec not in ("select info", "vs screen", "victory screen"):
+    if section not in _MEMBER_SECTIONS:
         return ({}, [])
 
+    # Facings only apply within their own section: take (and so clear) this
+    # section's entries up front, so repeated sections don't accidentally
+    # reuse old data.
+    facings = _facing_params.pop(section, None) or {}
+
     anchor_map = {}
     append_lines = []
 
     # First, flush velocities for this section.
-    for (s, base_player, kind), slot in list(_velocity_params.items()):
-        if s != sec:
-            continue
-        (vx, vy) = slot.get("v") if slot else (0.0, 0.0)
+    # Popping the section's bucket also clears it for repeated sections.
+    for (base_player, kind), slot in _velocity_params.pop(section, {}).items():
+        vx, vy = slot.v
 
         # Try to get a facing value for this player/kind.
-        facing = _facing_params.get((sec, base_player, kind))
+        facing = facings.get((base_player, kind))
         if facing is None:
             if kind == "plain":
                 # plain -> try face as fallback
-                facing = _facing_params.get((sec, base_player, "face"), 1.0)
+                facing = facings.get((base_player, "face"), 1.0)
             else:
                 # face/face2 -> try plain as fallback
-                facing = _facing_params.get((sec, base_player, "plain"), 1.0)
+                facing = facings.get((base_player, "plain"), 1.0)
 
         fx = vx * facing
         vel_str = f"{fx:g}, {vy:g}"
 
-        if sec == "select info":
+        if section == _SELECT_INFO:
             if kind == "face":
                 new_key = f"p{base_player}.face.velocity"
             elif kind == "face2":
@@ -892,32 +1134,37 @@ def _flush_velocity_for_section(section: str):
             else:
                 new_key = f"p{base_player}.face.velocity"
 
-        print(
-            f"[{section}] Aggregated velocity: p{base_player} {kind} "
-            f"slide.speed * facing={facing:g} -> {new_key} = {vel_str}",
-            file=sys.stderr,
+        log.debug(
+            "[%s] Aggregated velocity: p%s %s "
+            "slide.speed * facing=%g -> %s = %s",
+            section, base_player, kind, facing, new_key, vel_str,
         )
         line = f"{new_key} = {vel_str}"
 
-        anchor = slot.get("anchor") if slot else None
+        anchor = slot.anchor
         if anchor is not None:
             anchor_map.setdefault(anchor, []).append(line)
         else:
             append_lines.append(line)
 
-        del _velocity_params[(s, base_player, kind)]
-
-    # Then clear any stored facing for this section so repeated sections
-    # don't accidentally reuse old data.
-    for key in list(_facing_params.keys()):
-        s, _, _ = key
-        if s == sec:
-            del _facing_params[key]
     return (anchor_map, append_lines)
 
-SECTION_REGEX = re.compile(r'^[ \t]*\[([^]]+)\][ \t]*(?:;.*)?$')
+SECTION_REGEX = re.compile(r'^(?P<prefix>[ \t]*)\[(?P<name>[^]]+)\](?P<suffix>[ \t]*(?:;.*)?)$')
 KEY_VALUE_REGEX = re.compile(r'^[ \t]*(;?)[ \t]*([^=]+)=[ \t]*(.*)$')
 
+def _split_key_value(line: str):
+    """
+    Split an uncommented 'key = value' line at its first '=' into
+    (raw_key, raw_value), with the whitespace after '=' removed, or return
+    None if there is no '=' or nothing before it. Matches what
+    KEY_VALUE_REGEX captures for such lines, apart from whitespace around
+    raw_key, which callers strip anyway.
+    """
+    i = line.find("=")
+    if i <= 0:
+        return None
+    return line[:i], line[i + 1:].lstrip(" \t")
+
 def _ensure_utf8_stdio():
     """
     Force UTF-8 output on Windows consoles / redirection to avoid
@@ -932,6 +1179,14 @@ def _ensure_utf8_stdio():
         # below still strips a BOM via 'utf-8-sig'.
         pass
 
+# (base player digit, member digit) -> new player number, as strings, so
+# _remap_member_key() can look the characters of the key up directly.
+_MEMBER_KEY_PLAYERS = {
+    (str(base), str(member)): str(player)
+    for base, players in _PLAYER_MEMBER_MAP.items()
+    for member, player in enumerate(players, 1)
+}
+
 def _remap_member_key(orig_key: str):
     """
     Global mapping for any key that starts with p1./p2. and contains a ".memberX"
@@ -950,31 +1205,43 @@ def _remap_member_key(orig_key: str):
       p1.value.empty.icon.member4.spr   -> p7.value.empty.icon.spr
       p2.member2.icon.spr               -> p4.icon.spr
     """
-    m = re.match(r'^(p)([12])(\..*)$', orig_key, flags=re.IGNORECASE)
-    if not m:
+    if orig_key[:1] not in ("p", "P") or orig_key[1:3] not in ("1.", "2."):
         return orig_key, False
 
-    p_letter, base_str, rest = m.group(1), m.group(2), m.group(3)
-    mm = re.search(r'\.member([1-4])', rest, flags=re.IGNORECASE)
-    if not mm:
+    # Find the first ".memberN" (N in 1-4, case-insensitive) by walking the
+    # dots of the key, which is all the ".member[1-4]" search needs.
+    base = orig_key[1]
+    rest = orig_key[2:]
+    i = rest.find(".")
+    while i != -1:
+        if rest[i + 1:i + 7].lower() == "member":
+            new_p = _MEMBER_KEY_PLAYERS.get((base, rest[i + 7:i + 8]))
+            if new_p is not None:
+                break
+        i = rest.find(".", i + 1)
+    else:
         return orig_key, False
 
-    base = int(base_str)
-    member = int(mm.group(1))
-    target_map = {1: [1, 3, 5, 7], 2: [2, 4, 6, 8]}
-    new_p = target_map[base][member - 1]
-    new_rest = rest[:mm.start()] + rest[mm.end():]  # remove ".memberX" only
-    return f"{p_letter}{new_p}{new_rest}", True
+    new_rest = rest[:i] + rest[i + 8:]  # remove ".memberX" only
+    return f"{orig_key[0]}{new_p}{new_rest}", True
 
-def _remap_boxcursor_alpharange(orig_key: str):
+def _remap_boxcursor_alpharange(orig_key: str, key_lc: str):
     """
     If key name ends with 'boxcursor.alpharange' the mapping changes the key to
     'boxcursor.pulse'. Values set to '30, 20, 30'.
     """
-    m = re.match(r'^(.*\bboxcursor)\.alpharange$', orig_key, flags=re.IGNORECASE)
-    if not m:
+    # Same test as the former r'^(.*\bboxcursor)\.alpharange$' (case-insensitive)
+    # pattern: the suffix, with no word character right before 'boxcursor'.
+    # The prefix is kept from orig_key so it keeps its casing.
+    if not key_lc.endswith("boxcursor.alpharange"):
+        return orig_key, False
+    n = len("boxcursor.alpharange")
+    if _match_key(orig_key[-n:]) != "boxcursor.alpharange":
         return orig_key, False
-    return f"{m.group(1)}.pulse", True
+    before = orig_key[-n - 1:-n]
+    if before.isalnum() or before == "_":
+        return orig_key, False
+    return orig_key[:-len(".alpharange")] + ".pulse", True
 
 def _split_value_comment(s: str):
     """
@@ -982,17 +1249,20 @@ def _split_value_comment(s: str):
     original spacing before the semicolon. If there is no inline comment, the
     second element is an empty string.
     """
-    m = re.match(r'^(.*?)([ \t]*;.*)?$', s)
-    return (m.group(1), m.group(2) or '') if m else (s, '')
+    i = s.find(';')
+    if i < 0:
+        return (s, '')
+    body = s[:i].rstrip(' \t')
+    return (body, s[len(body):])
 
-def _should_strip_all_quotes_for_key(orig_key: str) -> bool:
+def _should_strip_all_quotes_for_key(key_lc: str) -> bool:
     """
     Only strip ALL quote characters for:
       - keys suffixed with ".key" (case-insensitive)
       - the key named exactly "glyphs" (case-insensitive)
+    key_lc is the already stripped and lowercased key.
     """
-    k = (orig_key or "").strip()
-    return k.lower() == "glyphs" or k.lower().endswith(".key")
+    return key_lc == "glyphs" or key_lc.endswith(".key")
 
 def _unwrap_wrapping_quotes(value_body: str):
     """
@@ -1002,27 +1272,44 @@ def _unwrap_wrapping_quotes(value_body: str):
     NOTE: This only removes ONE outer pair; it does NOT remove interior quotes.
     """
     s = value_body if value_body is not None else ""
-    m = re.match(r'^\s*"(.*)"\s*$', s, flags=re.DOTALL)
-    if m:
-        return True, m.group(1)
+    t = s.strip()
+    if len(t) >= 2 and t[0] == '"' and t[-1] == '"':
+        return True, t[1:-1]
     return False, s
 
-def _normalize_key_value_if_needed(orig_key: str, value: str) -> str:
+def _normalize_key_value_if_needed(key_lc: str, value: str) -> str:
     """
-    If key name ends with '.key' (case-insensitive):
+    If the lowercased key name key_lc ends with '.key':
       - strip '$' from key tokens (e.g. '$U' -> 'U')
       - normalize list separator: 'a&b&c' -> 'a, b, c'
     """
-    if re.search(r'\.key$', orig_key, flags=re.IGNORECASE):
+    if key_lc.endswith(".key"):
         cleaned = (value or "").replace('$', '')
         # Preserve existing comma-separated values; only normalize '&' lists.
-        parts = [p.strip() for p in cleaned.split('&')]
+        # Without an '&' the join below would just give the stripped value.
+        if '&' not in cleaned:
+            return cleaned.strip()
         # Drop empty tokens after cleanup
-        parts = [p for p in parts if p != '']
+        parts = [p for p in (p.strip() for p in cleaned.split('&')) if p]
         new_value = ', '.join(parts) if parts else cleaned.strip()
         return new_value
     return value
 
+def _configure_logging(level):
+    """Send the module logger's records at `level` and above to the stderr handler."""
+    log.setLevel(level)
+    if _log_handler not in log.handlers:
+        log.addHandler(_log_handler)
+    log.propagate = False
+
+def _init_worker(level):
+    """
+    ProcessPoolExecutor initializer: set up stdio and logging in a worker
+    the way main() does (spawned workers, as on Windows, start fresh).
+    """
+    _ensure_utf8_stdio()
+    _configure_logging(level)
+
 def _pause_before_exit():
     """
     On interactive consoles, wait for user confirmation before exiting
@@ -1040,6 +1327,10 @@ def _select_ini_via_dialog():
     Windows-only helper: open a file selection dialog (defaulting to .def) and
     return the chosen path, or an empty string/None if the user cancels.
     """
+    # Imported here so regular (path-argument) runs don't pay for loading Tk.
+    import tkinter as tk
+    from tkinter import filedialog
+
     root = tk.Tk()
     root.withdraw()
     root.update()
@@ -1055,200 +1346,220 @@ def _select_ini_via_dialog():
     root.destroy()
     return file_path
 
+def _resolve_anchors(buf, anchor_to_lines, trailing_lines):
+    # Anchors are plain ints, so telling them apart from lines and looking
+    # them up in anchor_to_lines both use the built-in int type.
+    out = []
+    append = out.append
+    for item in buf:
+        if type(item) is int:
+            lines = anchor_to_lines.pop(item, None)
+            if lines:
+                out.extend(lines)
+            # If no lines mapped, drop the placeholder entirely.
+        else:
+            append(item)
+    # Any leftovers (should be rare) preserve previous behavior by appending.
+    for lines in anchor_to_lines.values():
+        out.extend(lines)
+    if trailing_lines:
+        out.extend(trailing_lines)
+    return out
+
+def _write_lines(output_stream, lines):
+    # One write per finalized section instead of one print() per line.
+    if lines:
+        output_stream.write("\n".join(lines) + "\n")
+
+def _finalize_section(section_name: str, buf, rules, seen_keys):
+    """
+    Finish process_ini()'s buffered lines `buf` for a section, whose
+    _SECTION_TABLE entry is `rules` and whose active keys are `seen_keys`
+    (None for sections without append_if_missing entries):
+    - Insert append_if_missing lines *before* trailing blank/comment tail.
+    - Flush aggregation helpers, inserting their generated lines at the
+      anchor token location (the line that first initiated that aggregation).
+    """
+    if not section_name:
+        # Still allow velocity/scale/offset buffers for empty section names to clear,
+        # but there should be none in practice.
+        return buf
+
+    # 1) Append-if-missing (but *before* trailing comments/blanks)
+    missing_items = []
+    if rules.append:
+        for key_norm, k, v in rules.append:
+            if key_norm not in seen_keys:
+                log.debug("[%s] Appending missing key: %s", section_name, k)
+                new_items = handle_line(
+                    section=section_name,
+                    orig_key=k,
+                    value=v,
+                    comment="",
+                    rules=rules,
+                )
+                if new_items:
+                    missing_items.extend(new_items)
+
+    if missing_items:
+        # Insert right before the trailing blank/comment tail to avoid separating
+        # "header comments" intended for the next section.
+        i = len(buf) - 1
+        while i >= 0 and _is_trailing_comment_or_blank_line(buf[i]):
+            i -= 1
+        # buf is the caller's section buffer, which is discarded after
+        # finalizing, so the lines can be inserted in place.
+        buf[i + 1:i + 1] = missing_items
+
+    # 2) Flush aggregations for this section and insert at their anchors
+    anchor_map = {}
+    trailing_lines = []
+
+    a1, t1 = _flush_member_offsets_for_section(section_name)
+    anchor_map.update(a1)
+    trailing_lines.extend(t1)
+
+    a2, t2 = _flush_member_scales_for_section(section_name)
+    for k, v in a2.items():
+        anchor_map.setdefault(k, []).extend(v)
+    trailing_lines.extend(t2)
+
+    a3, t3 = _flush_velocity_for_section(section_name)
+    for k, v in a3.items():
+        anchor_map.setdefault(k, []).extend(v)
+    trailing_lines.extend(t3)
+
+    # Replace anchor tokens with their generated lines.
+    return _resolve_anchors(buf, anchor_map, trailing_lines)
+
+
 def process_ini(ini_path, output_stream, has_info=None, raw_version=None, parsed_version=None):
     """
     Core processing: read an INI file, apply all rules, and write the resulting
     lines to `output_stream` (a file-like object such as sys.stdout or
-    an io.StringIO instance).
+    the temp file that replaces the INI when patching in place).
     """
     current_section = ""
+    # _SECTION_TABLE entry for current_section, refreshed at each header
+    # instead of being looked up again for every key line.
+    section_rules = _EMPTY_RULES
     info_section_seen = False
     # True once we have written an active ikemenversion line in [Info].
     ikemenversion_written = False
     # Track active (non-commented) keys we've seen per section (case-insensitive).
-    seen_keys_by_section = {}
+    # Only sections with append_if_missing entries need them; seen_keys is
+    # the current section's set, or None when it isn't tracked.
+    seen_keys_by_section = defaultdict(set)
+    seen_keys = None
 
     # Buffer lines within a section so we can insert generated lines
     # (aggregations) at the point where their triggering line occurred
     section_buffer = []
 
-    def _resolve_anchors(buf, anchor_to_lines, trailing_lines):
-        out = []
-        for item in buf:
-            if isinstance(item, _AnchorToken):
-                lines = anchor_to_lines.pop(item, [])
-                if lines:
-                    out.extend(lines)
-                # If no lines mapped, drop the placeholder entirely.
-            else:
-                out.append(item)
-        # Any leftovers (should be rare) preserve previous behavior by appending.
-        for lines in anchor_to_lines.values():
-            out.extend(lines)
-        if trailing_lines:
-            out.extend(trailing_lines)
-        return out
-
-    def _finalize_section(section_name: str, buf):
-        """
-        - Insert append_if_missing lines *before* trailing blank/comment tail.
-        - Flush aggregation helpers, inserting their generated lines at the
-          AnchorToken location (the line that first initiated that aggregation).
-        """
-        if not section_name:
-            # Still allow velocity/scale/offset buffers for empty section names to clear,
-            # but there should be none in practice.
-            return buf
-
-        # 1) Append-if-missing (but *before* trailing comments/blanks)
-        section_map = append_if_missing.get(section_name, {})
-        missing_items = []
-        if section_map:
-            seen = seen_keys_by_section.get(section_name, set())
-            for k, v in section_map.items():
-                key_norm = str(k).strip().lower()
-                if key_norm not in seen:
-                    print(f"[{section_name}] Appending missing key: {k}", file=sys.stderr)
-                    new_items = handle_line(
-                        section=section_name,
-                        orig_key=str(k),
-                        value=str(v),
-                        comment=""
-                    )
-                    if new_items:
-                        missing_items.extend(new_items)
-
-        if missing_items:
-            # Insert right before the trailing blank/comment tail to avoid separating
-            # "header comments" intended for the next section.
-            i = len(buf) - 1
-            while i >= 0 and _is_trailing_comment_or_blank_line(buf[i]):
-                i -= 1
-            insert_at = i + 1
-            buf = buf[:insert_at] + missing_items + buf[insert_at:]
-
-        # 2) Flush aggregations for this section and insert at their anchors
-        anchor_map = {}
-        trailing_lines = []
-
-        a1, t1 = _flush_member_offsets_for_section(section_name)
-        anchor_map.update(a1)
-        trailing_lines.extend(t1)
-
-        a2, t2 = _flush_member_scales_for_section(section_name)
-        for k, v in a2.items():
-            anchor_map.setdefault(k, []).extend(v)
-        trailing_lines.extend(t2)
-
-        a3, t3 = _flush_velocity_for_section(section_name)
-        for k, v in a3.items():
-            anchor_map.setdefault(k, []).extend(v)
-        trailing_lines.extend(t3)
-
-        # Replace AnchorTokens with their generated lines.
-        return _resolve_anchors(buf, anchor_map, trailing_lines)
-
     # If caller indicated that there is no [Info] section at all, create one
     # at the very top of the output with the target ikemenversion.
     if has_info is False:
-        print("[Info]", file=output_stream)
-        print(f"ikemenversion = {TARGET_IKEMEN_VERSION_STR}", file=output_stream)
-        print("", file=output_stream)
+        output_stream.write(f"[Info]\nikemenversion = {TARGET_IKEMEN_VERSION_STR}\n\n")
         info_section_seen = True
         ikemenversion_written = True
 
-    with open(ini_path, 'r', encoding='utf-8-sig', errors='replace') as f:
-        for line in f:
-            raw_line = line.rstrip('\n')
+    # Bound once for the per-line loop below, which runs for every input line.
+    match_section = SECTION_REGEX.match
 
-            if raw_line.lstrip().startswith(";"):
-                section_buffer.append(raw_line)
-                continue
-
-            # 1) Check if it's a [Section] line
-            section_match = SECTION_REGEX.match(raw_line)
-            if section_match:
-                # Before switching sections, finalize & emit the previous buffer.
-                finalized = _finalize_section(current_section, section_buffer)
-                for item in finalized:
-                    print(item, file=output_stream)
-                section_buffer = []
-                orig_section_name = section_match.group(1).strip()
-                sec_lower = orig_section_name.lower()
-                sec_lower = SECTION_RENAMES.get(sec_lower, sec_lower)
-                current_section = sec_lower
-                if current_section == "info":
-                    info_section_seen = True
-                # Rewrite section header (preserve leading whitespace and trailing comments)
-                lb = raw_line.find("[")
-                rb = raw_line.rfind("]")
-                prefix = raw_line[:lb] if lb != -1 else ""
-                suffix = raw_line[rb+1:] if rb != -1 else ""
-                out_name = SECTION_CANONICAL_CASE.get(current_section, orig_section_name)
-                print(f"{prefix}[{out_name}]{suffix}", file=output_stream)
-                # If [Info] exists but has no active ikemenversion entry, insert it
-                # immediately after the section header (only once).
-                if current_section == "info" and raw_version is None and not ikemenversion_written:
-                    section_buffer.append(f"ikemenversion = {TARGET_IKEMEN_VERSION_STR}")
-                    ikemenversion_written = True
-                continue
+    for raw_line in _load_lines(ini_path):
+        first_char = raw_line.lstrip()[:1]
+        if first_char == ";":
+            section_buffer.append(raw_line)
+            continue
 
-            # 2) Check if it's a key=value line with optional comment
-            kv_match = KEY_VALUE_REGEX.match(raw_line)
-            if kv_match:
-                semicolon = kv_match.group(1)  # ";" or ""
-                raw_key = kv_match.group(2)
-                raw_value = kv_match.group(3)
-
-                raw_value_original = raw_value
-                preserve_original_line = True
-
-                comment_marker = ";" if semicolon == ";" else ""
-                clean_key = raw_key.strip()
-                # Record only active (non-commented) keys as "present" in this section.
-                if comment_marker != ";":
-                    seen_keys_by_section.setdefault(current_section, set()).add(clean_key.lower())
-
-                # If we are in [Info] and see ikemenversion, force it to the
-                # target version while preserving any inline comment.
-                if current_section == "info" and comment_marker != ";" and clean_key.lower() == "ikemenversion":
-                    body, inline_comment = _split_value_comment(raw_value)
-                    raw_value = f"{TARGET_IKEMEN_VERSION_STR}{inline_comment}"
-                    preserve_original_line = False
-                    ikemenversion_written = True
-                    print(
-                        f"[info] Updating ikemenversion to {TARGET_IKEMEN_VERSION_STR}",
-                        file=sys.stderr,
-                    )
+        # 1) Check if it's a [Section] line (only lines starting with '[' can be)
+        section_match = match_section(raw_line) if first_char == "[" else None
+        if section_match:
+            # Before switching sections, finalize & emit the previous buffer.
+            _write_lines(output_stream, _finalize_section(
+                current_section, section_buffer, section_rules, seen_keys,
+            ))
+            section_buffer = []
+            prefix, orig_section_name, suffix = section_match.group("prefix", "name", "suffix")
+            orig_section_name = orig_section_name.strip()
+            sec_lower = orig_section_name.lower()
+            header_rules = _SECTION_TABLE.get(sec_lower, _EMPTY_RULES)
+            # Interned so the per-line section comparisons and table lookups
+            # can succeed on the identity check before comparing characters.
+            current_section = sys.intern(header_rules.rename or sec_lower)
+            section_rules = (
+                _SECTION_TABLE.get(current_section, _EMPTY_RULES)
+                if header_rules.rename else header_rules
+            )
+            seen_keys = seen_keys_by_section[current_section] if section_rules.append else None
+            if current_section == "info":
+                info_section_seen = True
+            # Rewrite section header (preserve leading whitespace and trailing
+            # comments, both captured by SECTION_REGEX)
+            out_name = header_rules.case or orig_section_name
+            output_stream.write(f"{prefix}[{out_name}]{suffix}\n")
+            # If [Info] exists but has no active ikemenversion entry, insert it
+            # immediately after the section header (only once).
+            if current_section == "info" and raw_version is None and not ikemenversion_written:
+                section_buffer.append(f"ikemenversion = {TARGET_IKEMEN_VERSION_STR}")
+                ikemenversion_written = True
+            continue
 
-                new_items = handle_line(
-                    section=current_section,
-                    orig_key=clean_key,
-                    value=raw_value,
-                    comment=comment_marker,
-                    # Only preserve the original raw line if we didn't already force a semantic change before handle_line() runs.
-                    raw_line=(raw_line if preserve_original_line and raw_value == raw_value_original else None),
+        # 2) Check if it's a key=value line. Commented-out lines were passed
+        # through above, so every key seen here is active.
+        kv = _split_key_value(raw_line)
+        if kv:
+            raw_key, raw_value = kv
+
+            raw_value_original = raw_value
+            preserve_original_line = True
+
+            clean_key = raw_key.strip()
+            key_lc = clean_key.lower()
+            # Record active keys as "present" in this section.
+            if seen_keys is not None:
+                seen_keys.add(key_lc)
+
+            # If we are in [Info] and see ikemenversion, force it to the
+            # target version while preserving any inline comment.
+            if current_section == "info" and key_lc == "ikemenversion":
+                body, inline_comment = _split_value_comment(raw_value)
+                raw_value = f"{TARGET_IKEMEN_VERSION_STR}{inline_comment}"
+                preserve_original_line = False
+                ikemenversion_written = True
+                log.debug(
+                    "[info] Updating ikemenversion to %s",
+                    TARGET_IKEMEN_VERSION_STR,
                 )
 
-                # Write whatever lines we got back (unless empty => deleted)
-                if new_items:
-                    section_buffer.extend(new_items)
-            else:
-                # 3) Not a key-value line => pass it unchanged
-                section_buffer.append(raw_line)
+            new_items = handle_line(
+                section=current_section,
+                orig_key=clean_key,
+                value=raw_value,
+                comment="",
+                rules=section_rules,
+                # Only preserve the original raw line if we didn't already force a semantic change before handle_line() runs.
+                raw_line=(raw_line if preserve_original_line and raw_value == raw_value_original else None),
+            )
+
+            # Write whatever lines we got back (unless empty => deleted)
+            if new_items:
+                section_buffer.extend(new_items)
+        else:
+            # 3) Not a key-value line => pass it unchanged
+            section_buffer.append(raw_line)
 
     # End of file: flush appends for the final section.
-    finalized = _finalize_section(current_section, section_buffer)
-    for item in finalized:
-        print(item, file=output_stream)
+    _write_lines(output_stream, _finalize_section(
+        current_section, section_buffer, section_rules, seen_keys,
+    ))
+    _flush_log()
 
     # For callers that didn't provide has_info/raw_version (legacy usage),
     # fall back to adding [Info] at the end if it was never seen.
     if has_info is None and not info_section_seen:
-        print(f"[info] Adding missing [Info] section with ikemenversion = {TARGET_IKEMEN_VERSION_STR}", file=sys.stderr)
-        print("", file=output_stream)
-        print("[Info]", file=output_stream)
-        print(f"ikemenversion = {TARGET_IKEMEN_VERSION_STR}", file=output_stream)
+        log.info("[info] Adding missing [Info] section with ikemenversion = %s", TARGET_IKEMEN_VERSION_STR)
+        output_stream.write(f"\n[Info]\nikemenversion = {TARGET_IKEMEN_VERSION_STR}\n")
 
 
 def main(argv=None):
@@ -1268,35 +1579,56 @@ def main(argv=None):
         )
     )
     parser.add_argument(
-        "ini_path",
-        nargs="?",
-        help="Path to the INI file to process.",
+        "ini_paths",
+        nargs="*",
+        metavar="ini_path",
+        help="Path to the INI file to process (several may be given).",
     )
     parser.add_argument(
         "--stdout",
         action="store_true",
         help="Write patched INI to stdout instead of modifying the file in place.",
     )
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Report individual key changes on stderr.",
+    )
+    verbosity.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Only report warnings and errors on stderr.",
+    )
 
     args = parser.parse_args(argv)
+    if args.verbose:
+        _configure_logging(logging.DEBUG)
+    elif args.quiet:
+        _configure_logging(logging.WARNING)
+    elif _DEBUG:
+        _configure_logging(logging.DEBUG)
+    else:
+        _configure_logging(logging.INFO)
 
-    ini_path = args.ini_path
+    ini_paths = args.ini_paths
 
     # If no path was passed on the command line, decide behavior by platform.
-    if ini_path is None:
+    if not ini_paths:
         if sys.platform == "win32":
             # Show a file picker dialog so users can choose an INI file.
             try:
                 ini_path = _select_ini_via_dialog()
             except Exception as e:
-                print(f"Error opening file dialog: {e}", file=sys.stderr)
+                log.error("Error opening file dialog: %s", e)
                 _pause_before_exit()
                 return
 
             if not ini_path:
-                print("No file selected. Exiting.", file=sys.stderr)
+                log.info("No file selected. Exiting.")
                 _pause_before_exit()
                 return
+            ini_paths = [ini_path]
         else:
             # On macOS/Linux, just show help and exit if no args.
             parser.print_help(sys.stderr)
@@ -1304,6 +1636,91 @@ def main(argv=None):
             print("  screenpack-updater path/to/system.def", file=sys.stderr)
             sys.exit(1)
 
+    show_path = len(ini_paths) > 1
+    if not args.stdout:
+        # Patch each file once, even if it was given twice or under two
+        # names (e.g. through a symlink); two updates of the same file would
+        # race on its backup and on the replace.
+        unique_paths = {}
+        for ini_path in ini_paths:
+            real_path = os.path.realpath(ini_path)
+            if real_path in unique_paths:
+                log.info("[info] %s: same file as %s - skipped", ini_path, unique_paths[real_path])
+                continue
+            unique_paths[real_path] = ini_path
+        ini_paths = list(unique_paths.values())
+
+    # Files are independent of each other, so several in-place updates are
+    # spread over worker processes. With --stdout they run in order so the
+    # outputs don't interleave.
+    if len(ini_paths) > 1 and not args.stdout:
+        with ProcessPoolExecutor(
+            max_workers=min(len(ini_paths), os.cpu_count() or 1),
+            initializer=_init_worker,
+            initargs=(log.level,),
+        ) as pool:
+            results = list(pool.map(_update_file_checked, ini_paths, repeat(False), repeat(True)))
+    else:
+        results = [_update_file_checked(ini_path, args.stdout, show_path) for ini_path in ini_paths]
+    _pause_before_exit()
+    if not all(results):
+        sys.exit(1)
+
+def _create_backup(ini_path, backup_path):
+    """
+    Make backup_path hold the current contents of ini_path. A hard link is
+    enough, since the patched INI is written to a new file that replaces
+    ini_path; copying (with metadata) is the fallback where links aren't
+    supported, e.g. across devices or on FAT drives.
+
+    A symlinked ini_path is resolved first, so the backup holds the linked
+    file's contents rather than being a link to it. The backup is built
+    under a temporary name and only replaces an existing backup_path once
+    it is complete, so a failure keeps the previous backup.
+    """
+    source = os.path.realpath(ini_path)
+    tmp_path = backup_path + ".tmp"
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        try:
+            os.link(source, tmp_path)
+        except OSError:
+            shutil.copy2(source, tmp_path)
+        os.replace(tmp_path, backup_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def _update_file_checked(ini_path, to_stdout=False, show_path=False):
+    """
+    Run _update_file() for one file, reporting a failure as an error
+    message instead of raising, so the remaining files (and, in a worker
+    process, the rest of the pool) still get processed. Returns True on
+    success. The file's cached contents are released afterwards.
+    """
+    try:
+        _update_file(ini_path, to_stdout, show_path)
+        return True
+    except Exception as e:
+        log.error("ERROR: Failed to update '%s': %s", ini_path, e)
+        return False
+    finally:
+        _loaded_files.clear()
+        _flush_log()
+
+def _update_file(ini_path, to_stdout=False, show_path=False):
+    """
+    Check one INI file's ikemenversion and, if it needs patching, patch it
+    in place (creating a .bak backup first) or write the result to stdout.
+    With show_path the [info] messages name the file, for runs over
+    several files.
+    """
+    tag = f"[info] {ini_path}:" if show_path else "[info]"
+
     # Detect existing ikemenversion to decide if patching is needed.
     has_info, raw_version, parsed_version = _detect_ikemen_version(ini_path)
 
@@ -1329,17 +1746,15 @@ def main(argv=None):
         )
 
     if not patch_needed:
-        print(f"[info] {reason}", file=sys.stderr)
-        if args.stdout:
+        log.info("%s %s", tag, reason)
+        if to_stdout:
             # For --stdout, still output the original file so the behavior is predictable.
-            with open(ini_path, "r", encoding="utf-8-sig", errors="replace") as f:
-                sys.stdout.write(f.read())
-        _pause_before_exit()
+            sys.stdout.write(_load_file(ini_path)[0])
         return
 
-    print(f"[info] Patching required: {reason}", file=sys.stderr)
+    log.info("%s Patching required: %s", tag, reason)
 
-    if args.stdout:
+    if to_stdout:
         # write updated content to stdout.
         process_ini(ini_path, sys.stdout, has_info=has_info, raw_version=raw_version, parsed_version=parsed_version)
         # Inform user which ikemenversion the file was updated to.
@@ -1347,41 +1762,94 @@ def main(argv=None):
            from_str = "missing/invalid"
         else:
             from_str = raw_version.strip()
-        print(
-            f"[info] ikemenversion updated to {TARGET_IKEMEN_VERSION_STR} (was {from_str})",
-            file=sys.stderr,
+        log.info(
+            "%s ikemenversion updated to %s (was %s)",
+            tag, TARGET_IKEMEN_VERSION_STR, from_str,
         )
-        _pause_before_exit()
     else:
         # patch in place, creating a .bak backup first.
         backup_path = ini_path + ".bak"
         try:
-            shutil.copy2(ini_path, backup_path)
-            print(f"Backup created: {backup_path}", file=sys.stderr)
+            _create_backup(ini_path, backup_path)
+            log.info("Backup created: %s", backup_path)
         except Exception as e:
-            print(
-                f"WARNING: Failed to create backup '{backup_path}': {e}",
-                file=sys.stderr,
-            )
-
-        buf = io.StringIO()
-        process_ini(ini_path, buf, has_info=has_info, raw_version=raw_version, parsed_version=parsed_version)
-        new_content = buf.getvalue()
-        with open(ini_path, "w", encoding="utf-8", errors="replace") as f:
-            f.write(new_content)
+            log.warning("WARNING: Failed to create backup '%s': %s", backup_path, e)
+
+        # Stream the patched lines into a temp file next to the original and
+        # swap it in only once processing succeeded, so the output is never
+        # held in memory as a whole and a failure leaves the INI untouched.
+        # A symlinked INI is resolved first, so the file it points to is
+        # patched and the link itself stays in place.
+        target = os.path.realpath(ini_path)
+        tmp = tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", errors="replace",
+            dir=os.path.dirname(target),
+            prefix=os.path.basename(target) + ".", suffix=".tmp",
+            delete=False,
+        )
+        try:
+            with tmp:
+                process_ini(ini_path, tmp, has_info=has_info, raw_version=raw_version, parsed_version=parsed_version)
+                # Make sure the data is on disk before it replaces the INI.
+                tmp.flush()
+                os.fsync(tmp.fileno())
+            shutil.copymode(target, tmp.name)
+            # The temp file belongs to whoever runs the patcher. Hand it to
+            # the INI's owner where that is allowed (as root, or for the group
+            # if we are a member); otherwise the patched INI changes owner.
+            if hasattr(os, "chown"):
+                st = os.stat(target)
+                try:
+                    os.chown(tmp.name, st.st_uid, st.st_gid)
+                except OSError:
+                    pass
+            os.replace(tmp.name, target)
+        except BaseException:
+            try:
+                os.unlink(tmp.name)
+            except OSError:
+                pass
+            raise
 
         # Inform user which ikemenversion the file was updated to.
         if raw_version is None:
             from_str = "missing/invalid"
         else:
             from_str = raw_version.strip()
-        print(
-            f"[info] ikemenversion updated to {TARGET_IKEMEN_VERSION_STR} (was {from_str})",
-            file=sys.stderr,
+        log.info(
+            "%s ikemenversion updated to %s (was %s)",
+            tag, TARGET_IKEMEN_VERSION_STR, from_str,
         )
-        _pause_before_exit()
 
-def handle_line(section, orig_key, value, comment, raw_line=None):
+
+# Menu-related sections whose empty *.itemname.*empty entries become spacers.
+_ITEMNAME_SPACER_SECTIONS = frozenset((
+    "title info",
+    "select info",
+    "option info",
+    "attract mode",
+    "pause menu",
+    "training pause menu",
+    "replay info",
+))
+
+# [Hiscore Info] title.text is expanded into one line per ranking mode.
+_HISCORE_TITLES = (
+    ("arcade", "Ranking Arcade"),
+    ("teamarcade", "Ranking Team Arcade"),
+    ("teamcoop", "Ranking Team Cooperative"),
+    ("timeattack", "Ranking Time Attack"),
+    ("survival", "Ranking Survival"),
+    ("survivalcoop", "Ranking Survival Cooperative"),
+)
+_HISCORE_TITLE_LINES = tuple(
+    f"title.text.{mode} = {label}" for mode, label in _HISCORE_TITLES
+)
+_HISCORE_TITLE_LINES_QUOTED = tuple(
+    f'title.text.{mode} = "{label}"' for mode, label in _HISCORE_TITLES
+)
+
+def handle_line(section, orig_key, value, comment, raw_line=None, rules=None):
     """
     1) Check if key should be deleted (keys_to_delete).
     2) If not deleted, apply value modifications (value_modifications).
@@ -1389,102 +1857,146 @@ def handle_line(section, orig_key, value, comment, raw_line=None):
        - For *.key and glyphs: remove ALL double-quote characters from values.
        - For all other keys: preserve quotes (including full-value wrapping quotes).
     4) Apply transformations on the key (transformations).
-    Return a list of lines to print. If empty => line is removed entirely.
+    Return a list of lines to print.
+    If empty => line is removed entirely.
+    `rules` is the section's _SECTION_TABLE entry when the caller already
+    has it; otherwise it is looked up here.
     """
     changed = False
-    # Check for key deletion
-    for pattern in keys_to_delete.get(section, []):
-        if pattern.match(orig_key):
-            print(f"[{section}] Deleting line for key: {orig_key}", file=sys.stderr)
-            return []
+    # Rules are matched against the lowercased key (see _match_key()). It is
+    # computed once here and passed on to the helpers, and only refreshed
+    # when a remap below changes orig_key.
+    key_lc = _match_key(orig_key)
+    # Check for key deletion (one match against the section's combined rules)
+    if rules is None:
+        rules = _SECTION_TABLE.get(section, _EMPTY_RULES)
+    # The unions only run for keys starting with one of their literal prefixes.
+    delete_union = rules.delete_union
+    if key_lc in rules.delete_literals or (
+        delete_union is not None
+        and key_lc.startswith(delete_union[2])
+        and delete_union[0].match(key_lc)
+    ):
+        log.debug("[%s] Deleting line for key: %s", section, orig_key)
+        return []
 
     # Work only on the part before an inline comment; keep the comment to reattach later.
-    value_body, inline_comment = _split_value_comment(value)
+    # Most values have no inline comment, so skip the call for those.
+    if ";" in value:
+        value_body, inline_comment = _split_value_comment(value)
+    else:
+        value_body, inline_comment = value, ""
 
     # Preserve full-value wrapping quotes for non-target keys, but do all processing
     # on the unwrapped inner value so numeric parsing/regex rules keep working.
     was_wrapped, inner_value = _unwrap_wrapping_quotes(value_body)
-    strip_all_quotes = _should_strip_all_quotes_for_key(orig_key)
+    strip_all_quotes = _should_strip_all_quotes_for_key(key_lc)
 
     if strip_all_quotes and was_wrapped:
         changed = True
 
     # Value modifications
     new_value = inner_value
-    for (key_rx, val_rx, repl) in value_modifications.get(section, []):
-        if key_rx.match(orig_key):
+    value_rules = rules.modify
+    first_rule = len(value_rules)
+    if rules.modify_union is not None:
+        union, group_to_rule, prefixes = rules.modify_union
+        m = union.match(key_lc) if key_lc.startswith(prefixes) else None
+        if m:
+            first_rule = group_to_rule[m.lastindex]
+    # Several rules may apply to the same key, so after the first hit the
+    # remaining rules are still checked (and applied) in order.
+    for i in range(first_rule, len(value_rules)):
+        key_rx, val_rx, repl = value_rules[i]
+        if i == first_rule or key_rx.match(key_lc):
             old_value = new_value
             new_value = val_rx.sub(repl, new_value)
             if new_value != old_value:
                 changed = True
-                print(
-                    f"[{section}] Value modified for key {orig_key}: "
-                    f"'{old_value}' => '{new_value}'",
-                    file=sys.stderr
+                log.debug(
+                    "[%s] Value modified for key %s: "
+                    "'%s' => '%s'",
+                    section, orig_key, old_value, new_value,
                 )
 
     # Quote handling:
     # - For *.key and glyphs: strip ALL quote chars.
     # - Otherwise: keep exactly whether the original was wrapped.
-    if strip_all_quotes:
-        stripped = new_value.replace('"', '')
-        if stripped != new_value:
-            changed = True
-        new_value = stripped
+    if strip_all_quotes and '"' in new_value:
+        new_value = new_value.replace('"', '')
+        changed = True
 
     # Value for parsing/aggregation checks should never include wrapping quotes.
     # (And for strip_all_quotes keys, it also won't include interior quotes.)
     value_for_logic = new_value
 
     # Globally normalize any "*.key" value: a&b&c -> a, b, c
-    if re.search(r'\.key$', orig_key, re.IGNORECASE):
+    if key_lc.endswith(".key"):
         old_v = new_value
-        new_value = _normalize_key_value_if_needed(orig_key, new_value)
+        new_value = _normalize_key_value_if_needed(key_lc, new_value)
         if new_value != old_v:
             changed = True
-            print(
-                f"[global] Normalized .key list for {orig_key}: '{old_v}' => '{new_value}'",
-                file=sys.stderr
+            log.debug(
+                "[global] Normalized .key list for %s: '%s' => '%s'",
+                orig_key, old_v, new_value,
             )
         value_for_logic = new_value
 
     # Only active (non-commented) lines participate in aggregation helpers.
     # Commented lines (starting with ';') should remain comments and must not
-    # produce new active entries.
-    if comment != ";":
+    # produce new active entries. Every aggregated key is a pN.* key in one
+    # of _MEMBER_SECTIONS, so all other keys skip the helpers' pattern
+    # matches. The member/boxcursor remaps below keep a pN prefix, so this
+    # also holds for the slide.speed check after them.
+    aggregate = (
+        comment != ";"
+        and key_lc[:1] == "p"
+        and key_lc[1:2].isdigit()
+        and section in _MEMBER_SECTIONS
+    )
+    if aggregate:
         # Record facing first so it's available when we later turn slide.speed
         # into velocity with the correct direction.
-        _record_facing_param(section, orig_key, value_for_logic)
+        _record_facing_param(section, orig_key, key_lc, value_for_logic)
 
         # Then, see if this is a base/member offset that should be aggregated
         # into a single pX[.face|.face2].offset per final player.
-        handled, anchor = _record_member_offset_param(section, orig_key, value_for_logic)
+        handled, anchor = _record_member_offset_param(section, orig_key, key_lc, value_for_logic)
         if handled:
             return [anchor] if anchor is not None else []
 
         # Next, see if this is a base/member scale that should be aggregated.
-        handled, anchor = _record_member_scale_param(section, orig_key, value_for_logic)
+        handled, anchor = _record_member_scale_param(section, orig_key, key_lc, value_for_logic)
         if handled:
             return [anchor] if anchor is not None else []
 
     # Convert p1/p2 + ".memberX" segments into p1/p3/p5/p7 or p2/p4/p6/p8,
     # and drop the ".memberX" segment from the key path.
-    remapped_key, did_remap = _remap_member_key(orig_key)
+    # Both remaps are gated on key_lc here, so the common key skips the calls.
+    if key_lc.startswith(("p1.", "p2.")):
+        remapped_key, did_remap = _remap_member_key(orig_key)
+    else:
+        did_remap = False
     if did_remap:
         changed = True
-        print(f"[global] Member key remapped: {orig_key} => {remapped_key}", file=sys.stderr)
+        log.debug("[global] Member key remapped: %s => %s", orig_key, remapped_key)
         orig_key = remapped_key
+        key_lc = _match_key(orig_key)
 
     # Convert any '<prefix>boxcursor.alpharange' into '<prefix>boxcursor.pulse'
-    remapped_key2, did_remap2 = _remap_boxcursor_alpharange(orig_key)
+    if key_lc.endswith("boxcursor.alpharange"):
+        remapped_key2, did_remap2 = _remap_boxcursor_alpharange(orig_key, key_lc)
+    else:
+        did_remap2 = False
     if did_remap2:
         changed = True
-        print(
-            f"[global] Boxcursor alpharange remapped: {orig_key} => {remapped_key2}; "
-            f"value forced to '30, 20, 30'",
-            file=sys.stderr,
+        log.debug(
+            "[global] Boxcursor alpharange remapped: %s => %s; "
+            "value forced to '30, 20, 30'",
+            orig_key, remapped_key2,
         )
         orig_key, new_value = remapped_key2, "30, 20, 30"
+        key_lc = _match_key(orig_key)
 
     # In menu-related sections, convert any *.itemname.*empty with an empty value
     # into *.itemname.*spacer = -
@@ -1493,48 +2005,37 @@ def handle_line(section, orig_key, value, comment, raw_line=None):
     #   menu.itemname.foo.empty =
     # becomes:
     #   menu.itemname.foo.spacer = -
-    if comment != ";" and section in (
-        "title info",
-        "select info",
-        "option info",
-        "attract mode",
-        "pause menu",
-        "training pause menu",
-        "replay info",
-    ):
-        m = re.match(r"^(.+\.itemname\..*)empty$", orig_key, flags=re.IGNORECASE)
-        if m and value_for_logic.strip() == "":
-            new_key = m.group(1) + "spacer"
-            print(
-                f"[{section}] Converting empty itemname: {orig_key} => {new_key} = -",
-                file=sys.stderr,
+    if comment != ";" and section in _ITEMNAME_SPACER_SECTIONS:
+        # Same as matching r"^(.+\.itemname\..*)empty$" case-insensitively:
+        # ".itemname." must start after the first character and end before
+        # the "empty" suffix. orig_key[:-5] keeps the key's casing.
+        idx = key_lc.find(".itemname.", 1) if key_lc.endswith("empty") else -1
+        if idx != -1 and idx + 15 <= len(key_lc) and value_for_logic.strip() == "":
+            new_key = orig_key[:-5] + "spacer"
+            log.debug(
+                "[%s] Converting empty itemname: %s => %s = -",
+                section, orig_key, new_key,
             )
             return [f"{comment}{new_key} = -{inline_comment}"]
 
     # Expand [Hiscore Info] title.text into six fixed lines
-    if section == "hiscore info" and re.match(r"^title\.text$", orig_key, re.IGNORECASE):
+    if section == _HISCORE_INFO and key_lc == "title.text":
         changed = True
         # Preserve wrapping quotes ONLY if the original value was wrapped and this
         # key is not one of the quote-stripping targets.
-        q = '"' if (was_wrapped and not strip_all_quotes) else ""
-        out_lines = [
-            f"{comment}title.text.arcade = {q}Ranking Arcade{q}",
-            f"{comment}title.text.teamarcade = {q}Ranking Team Arcade{q}",
-            f"{comment}title.text.teamcoop = {q}Ranking Team Cooperative{q}",
-            f"{comment}title.text.timeattack = {q}Ranking Time Attack{q}",
-            f"{comment}title.text.survival = {q}Ranking Survival{q}",
-            f"{comment}title.text.survivalcoop = {q}Ranking Survival Cooperative{q}",
-        ]
-        print(
-            f"[{section}] Expanded {orig_key} into 6 title.text.* lines",
-            file=sys.stderr
+        quoted = was_wrapped and not strip_all_quotes
+        lines = _HISCORE_TITLE_LINES_QUOTED if quoted else _HISCORE_TITLE_LINES
+        out_lines = [comment + line for line in lines] if comment else list(lines)
+        log.debug(
+            "[%s] Expanded %s into 6 title.text.* lines",
+            section, orig_key,
         )
         return out_lines
 
     # After member remapping and other adjustments, capture slide.speed so we
     # can convert it into velocity (with facing applied) when the section ends.
-    if comment != ";":
-        handled, anchor = _record_velocity_param(section, orig_key, value_for_logic)
+    if aggregate:
+        handled, anchor = _record_velocity_param(section, orig_key, key_lc, value_for_logic)
         if handled:
             return [anchor] if anchor is not None else []
 
@@ -1545,7 +2046,9 @@ def handle_line(section, orig_key, value, comment, raw_line=None):
         value_for_output = new_value
 
     # Key transformations
-    transformed_lines = apply_key_transformations(section, orig_key, value_for_output + inline_comment, comment)
+    transformed_lines = apply_key_transformations(
+        section, orig_key, key_lc, value_for_output, inline_comment, comment, rules
+    )
     if transformed_lines:
         return transformed_lines
 
@@ -1556,62 +2059,110 @@ def handle_line(section, orig_key, value, comment, raw_line=None):
     # Keep as is
     return [f"{comment}{orig_key} = {value_for_output}{inline_comment}"]
 
-def apply_key_transformations(section, orig_key, value, comment):
+# Parts of the [Select Info] cell.<row>.<col>.<suffix> and
+# p<1|2>.cursor.<state>.<row>.<col>.<suffix> keys, checked on the
+# lowercased key split at its dots.
+_SELECT_CELL_SUFFIXES = frozenset(("offset", "facing", "skip"))
+_SELECT_CURSOR_STATES = frozenset(("active", "done"))
+_SELECT_CURSOR_SUFFIXES = frozenset(("anim", "spr", "offset", "facing", "scale"))
+
+def _is_index(part: str) -> bool:
+    """True if `part` is a non-empty run of ASCII digits (like [0-9]+)."""
+    return part.isascii() and part.isdecimal()
+
+# Decimal index string -> the 0-based index string, for the usual small
+# grid indices. Anything else (leading zeros, huge values) goes through
+# _to_zero_based().
+_ZERO_BASED_INDEX = {str(i): str(i - 1) for i in range(256)}
+
+def _to_zero_based(index):
+    return _ZERO_BASED_INDEX.get(index) or str(int(index) - 1)
+
+def apply_key_transformations(
+    section, orig_key, key_lc, value, inline_comment, comment, rules
+):
     # Special-case [Select Info] where we now want 0-based indices instead of 1-based.
     # This keeps the param rename (row.col -> row-col) but also shifts indices by -1.
-    if section == "select info":
+    if section == _SELECT_INFO:
         # cell.<row>.<col>.(offset|facing|skip) -> cell.<row-1>-<col-1>.(...)
-        m = re.match(
-            r"^cell\.([0-9]+)\.([0-9]+)\.(offset|facing|skip)$",
-            orig_key,
-            flags=re.IGNORECASE,
-        )
-        if m:
-            row = int(m.group(1)) - 1
-            col = int(m.group(2)) - 1
-            suffix = m.group(3).lower()
+        # The key shapes are fixed, so a prefix test and a split at the dots
+        # take the place of a regex.
+        parts = key_lc.split(".") if key_lc.startswith("cell.") else ()
+        if (
+            len(parts) == 4 and parts[3] in _SELECT_CELL_SUFFIXES
+            and _is_index(parts[1]) and _is_index(parts[2])
+        ):
+            if not orig_key.isascii():
+                # Emit the name as lowercased, not as folded by _match_key().
+                parts = orig_key.lower().split(".")
+            row = _to_zero_based(parts[1])
+            col = _to_zero_based(parts[2])
+            suffix = parts[3]
             new_key = f"cell.{row}-{col}.{suffix}"
-            print(
-                f"[{section}] Key modified (1-based -> 0-based): {orig_key} => {new_key}",
-                file=sys.stderr,
+            log.debug(
+                "[%s] Key modified (1-based -> 0-based): %s => %s",
+                section, orig_key, new_key,
             )
-            return [f"{comment}{new_key} = {value}"]
+            return [f"{comment}{new_key} = {value}{inline_comment}"]
 
         # p<1|2>.cursor.(active|done).<row>.<col>.(anim|spr|offset|facing|scale) ->
         # p<1|2>.cursor.(active|done).<row-1>-<col-1>.(...)
-        m = re.match(
-           r"^p([12])\.cursor\.(active|done)\.([0-9]+)\.([0-9]+)\."
-            r"(anim|spr|offset|facing|scale)$",
-            orig_key,
-            flags=re.IGNORECASE,
-        )
-        if m:
-            player = m.group(1)
-            cursor_state = m.group(2).lower()   # active / done
-            row = int(m.group(3)) - 1
-            col = int(m.group(4)) - 1
-            suffix = m.group(5).lower()
+        parts = key_lc.split(".") if key_lc.startswith(("p1.cursor.", "p2.cursor.")) else ()
+        if (
+            len(parts) == 6 and parts[2] in _SELECT_CURSOR_STATES
+            and parts[5] in _SELECT_CURSOR_SUFFIXES
+            and _is_index(parts[3]) and _is_index(parts[4])
+        ):
+            player = key_lc[1]
+            if not orig_key.isascii():
+                parts = orig_key.lower().split(".")
+            cursor_state = parts[2]   # active / done
+            row = _to_zero_based(parts[3])
+            col = _to_zero_based(parts[4])
+            suffix = parts[5]
             new_key = f"p{player}.cursor.{cursor_state}.{row}-{col}.{suffix}"
-            print(
-                f"[{section}] Key modified (1-based -> 0-based): {orig_key} => {new_key}",
-                file=sys.stderr,
+            log.debug(
+                "[%s] Key modified (1-based -> 0-based): %s => %s",
+                section, orig_key, new_key,
             )
-            return [f"{comment}{new_key} = {value}"]
+            return [f"{comment}{new_key} = {value}{inline_comment}"]
 
-    section_rules = transformations.get(section, [])
-    for (pattern, replacements) in section_rules:
-        m = pattern.match(orig_key)
-        if m:
-            out_lines = []
-            for rep in replacements:
-                new_key = m.expand(rep)
-                val_out = value
-                out_lines.append(f"{comment}{new_key} = {val_out}")
-                print(f"[{section}] Key modified: {orig_key} => {new_key}", file=sys.stderr)
-            # Stop after the first matching rule to avoid duplicate transformations.
-            return out_lines
-    return None
+    if rules.transform_union is None:
+        return None
+    union, group_to_rule, prefixes = rules.transform_union
+    if not key_lc.startswith(prefixes):
+        return None
+    um = union.match(key_lc)
+    if not um:
+        return None
+    # Only the first matching rule applies, to avoid duplicate transformations.
+    # The rule's own groups follow its (?P<rN>...) group in the union, so
+    # captured text is cut from orig_key at the spans matched on key_lc and
+    # keeps its casing (_match_key() keeps the key's length, so the spans
+    # line up). Uncompiled templates need a Match to expand, so for them
+    # the original key is matched case-insensitively with the rule's own
+    # pattern instead.
+    rule_group = um.lastindex
+    rule = group_to_rule[rule_group]
+    pattern, replacements = rules.transform[rule]
+    templates = rules.transform_templates[rule]
+    m = None
+    if None in templates:
+        m = re.compile(pattern.pattern, re.IGNORECASE).match(orig_key)
+    out_lines = []
+    for rep, parts in zip(replacements, templates):
+        if type(parts) is str:
+            new_key = parts
+        elif m is None:
+            new_key = _expand_template_spans(parts, um, rule_group, orig_key)
+        else:
+            new_key = _expand_template(parts, m) if parts is not None else m.expand(rep)
+        out_lines.append(f"{comment}{new_key} = {value}{inline_comment}")
+        log.debug("[%s] Key modified: %s => %s", section, orig_key, new_key)
+    return out_lines
 
 
 if __name__ == "__main__":
+    # Needed for the worker processes of a frozen (PyInstaller) Windows build.
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,8 @@
+"""Load screenpack-updater.py (not importable by name) as module `spu`."""
+import importlib.util
+import os
+
+_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "screenpack-updater.py")
+_spec = importlib.util.spec_from_file_location("screenpack_updater", _SCRIPT)
+spu = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(spu)
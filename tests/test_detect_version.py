@@ -0,0 +1,58 @@
+import io
+import os
+import tempfile
+import unittest
+
+from _load import spu
+
+
+class DetectIkemenVersionTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.addCleanup(spu._loaded_files.clear)
+
+    def write_ini(self, text):
+        path = os.path.join(self.tmpdir.name, "system.def")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        return path
+
+    def patched(self, path):
+        has_info, raw_version, parsed = spu._detect_ikemen_version(path)
+        out = io.StringIO()
+        spu.process_ini(path, out, has_info=has_info, raw_version=raw_version, parsed_version=parsed)
+        return out.getvalue()
+
+    def test_info_after_long_preamble(self):
+        path = self.write_ini("; comment\n" * 300 + "[Info]\nikemenversion = 1.0\n")
+        has_info, raw_version, parsed = spu._detect_ikemen_version(path)
+        self.assertTrue(has_info)
+        self.assertEqual(raw_version, "1.0")
+        self.assertEqual(parsed, 1.0)
+
+    def test_version_in_later_info_block(self):
+        path = self.write_ini(
+            "[Info]\nname = test\n\n[Files]\nspr = system.sff\n\n"
+            "[Info]\nikemenversion = 0.99\n"
+        )
+        has_info, raw_version, parsed = spu._detect_ikemen_version(path)
+        self.assertTrue(has_info)
+        self.assertEqual(raw_version, "0.99")
+        self.assertEqual(parsed, 0.99)
+        # The version is only updated in place, never inserted into the
+        # first [Info] block as well.
+        self.assertEqual(self.patched(path).count("ikemenversion"), 1)
+
+    def test_overlong_version_parses_as_inf(self):
+        # Too many digits for an int() conversion or for a float result.
+        for version in ("1" * 5000, "1" * 400 + ".5"):
+            path = self.write_ini(f"[Info]\nikemenversion = {version}\n")
+            spu._loaded_files.clear()
+            has_info, raw_version, parsed = spu._detect_ikemen_version(path)
+            self.assertTrue(has_info)
+            self.assertEqual(parsed, float("inf"))
+
+
+if __name__ == "__main__":
+    unittest.main()
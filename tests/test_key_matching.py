@@ -0,0 +1,17 @@
+import unittest
+
+from _load import spu
+
+
+class NonAsciiKeyMatchingTest(unittest.TestCase):
+    def test_dotted_capital_i_matches_like_ignorecase(self):
+        out = spu.handle_line("hiscore info", "İtem.data.x.text", "%s", "")
+        self.assertEqual(out, ["item.result.x.text = %d"])
+
+    def test_long_s_matches_like_ignorecase(self):
+        out = spu.handle_line("select info", "cell.1.2.ſkip", "1", "")
+        self.assertEqual(out, ["cell.0-1.ſkip = 1"])
+
+
+if __name__ == "__main__":
+    unittest.main()